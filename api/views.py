@@ -41,7 +41,9 @@ import json
 from collections import defaultdict
 
 from yaksh.code_server import get_result as get_result_from_code_server
-from yaksh.settings import SERVER_POOL_PORT, SERVER_HOST_NAME
+from yaksh.settings import (
+    SERVER_POOL_PORT, SERVER_HOST_NAME, API_RESULT_WAIT
+)
 
 from api.serializers import (
     QuestionSerializer, QuizSerializer, QuestionPaperSerializer,
@@ -1198,7 +1200,15 @@ class AnswerValidator(APIView):
         # Code execution polling
         ans = Answer.objects.get(pk=uid)
         url = f"{SERVER_HOST_NAME}:{SERVER_POOL_PORT}"
-        result = get_result_from_code_server(url, uid)
+        # Clients may ask us to hold the request until the result is ready,
+        # but only briefly as it ties up this worker meanwhile.
+        try:
+            wait = float(request.query_params.get('wait', 0))
+        except ValueError:
+            return Response({'error': 'wait must be a number of seconds.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        wait = min(wait, API_RESULT_WAIT) if wait > 0 else 0
+        result = get_result_from_code_server(url, uid, wait=wait)
 
         if result['status'] == 'done':
             final = json.loads(result['result'])
@@ -431,8 +431,10 @@ export const submitAnswer = async (answerpaperId, questionId, answer) => {
   return response.data;
 };
 
-export const getAnswerResult = async (answerId) => {
-  const response = await api.get(`/api/validate/${answerId}/`);
+export const getAnswerResult = async (answerId, wait = 0) => {
+  const response = await api.get(`/api/validate/${answerId}/`, {
+    params: wait ? { wait } : undefined
+  });
   return response.data;
 };
 
@@ -5,6 +5,10 @@ import { AiOutlineWarning } from 'react-icons/ai';
 import QuizSidebar from '../components/layout/QuizSidebar';
 import { startQuiz, submitAnswer, getAnswerResult, quitQuiz } from '../api/api';
 
+// Seconds the server may hold a result request open (long polling), it
+// answers sooner when the result is ready.  The server caps this.
+const RESULT_WAIT_SECONDS = 2;
+
 const Quiz = () => {
   const { courseId, quizId } = useParams();
   const navigate = useNavigate();
@@ -296,7 +300,8 @@ const Quiz = () => {
 
     const poll = async () => {
       try {
-        const result = await getAnswerResult(uid);
+        // The server holds the request briefly until the result is ready
+        const result = await getAnswerResult(uid, RESULT_WAIT_SECONDS);
 
         if (result.status === 'done') {
           // Evaluation complete - remove from evaluating set
@@ -315,7 +320,7 @@ const Quiz = () => {
         // Still running - poll again
         if (attempts < maxAttempts) {
           attempts++;
-          setTimeout(poll, 1000); // Poll every 1 second
+          setTimeout(poll, 1000); // Poll again after 1 second
         } else {
           // Timeout
           setEvaluatingQuestions((prev) => {
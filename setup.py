@@ -41,6 +41,7 @@ setup(
     entry_points={
             'console_scripts': [
                 'yaksh = yaksh.code_server:main',
+                'yaksh_router = yaksh.code_server_router:main',
             ],
     },
     description='A django app to conduct online programming tests.',
@@ -2,19 +2,55 @@
 from __future__ import unicode_literals
 import os
 from os.path import abspath, exists
+import resource
+import selectors
 import subprocess
 import stat
 import signal
+import threading
+import time
 
 
 # Local imports
 from .grader import TimeoutException
+from .settings import OUTPUT_LIMIT
+
+RLIMITS = {
+    'cpu': resource.RLIMIT_CPU,
+    'memory': resource.RLIMIT_AS,
+    'files': resource.RLIMIT_NOFILE,
+    'processes': resource.RLIMIT_NPROC,
+}
 
 
 class BaseEvaluator(object):
     """Base Evaluator class containing generic attributes
         and callable methods"""
 
+    # Results of the commands run for a submission, shared by the evaluators
+    # of all its test cases.  Set by the grader.
+    compile_cache = None
+
+    # Whether check_code may run alongside the checks of the submission's
+    # other test cases, once they have all been compiled.
+    parallel_check = False
+
+    # Most seconds a process started for a test case may run, set by the
+    # grader.
+    check_timeout = None
+
+    # Resource limits of the processes started, see RESOURCE_LIMITS in
+    # settings.py.  Set by the grader.
+    resource_limits = None
+
+    # Most bytes of output read from a process started for a test case.
+    output_limit = OUTPUT_LIMIT
+
+    # Processes started for the test case, and whether they have been
+    # killed, see `_popen` and `kill_processes`.
+    _processes = ()
+    _killed = False
+
     def __init__(self):
         pass
 
@@ -24,15 +60,84 @@ class BaseEvaluator(object):
     def compile_code(self):
         pass
 
+    def _limit_process(self, exclude=()):
+        """Put a process about to run code in a process group of its own
+        and apply the resource limits, but those named in `exclude`, to it.
+        Meant to be the `preexec_fn` of the process.
+        """
+        os.setpgrp()
+        for rlimit, limits in self._get_rlimits(exclude):
+            resource.setrlimit(rlimit, limits)
+
+    def _get_rlimits(self, exclude=()):
+        """Returns (resource, (soft, hard)) pairs of the resource limits
+        but those named in `exclude`.
+        """
+        rlimits = []
+        for name, limit in (self.resource_limits or {}).items():
+            if limit is None or name in exclude:
+                continue
+            soft, hard = resource.getrlimit(RLIMITS[name])
+            if hard != resource.RLIM_INFINITY:
+                limit = min(limit, hard)
+            rlimits.append((RLIMITS[name], (limit, limit)))
+        return rlimits
+
+    def _popen(self, *args, **kw):
+        """Start a process to run code like `subprocess.Popen`, in a
+        process group of its own and with the resource limits applied.
+
+        A `preexec_fn` is not safe in the threads test cases are checked in
+        when they are checked in parallel.  There the process is started in
+        a session of its own instead, and limited as soon as it has started.
+        """
+        if threading.current_thread() is threading.main_thread():
+            proc = subprocess.Popen(*args, preexec_fn=self._limit_process,
+                                    **kw)
+        else:
+            proc = subprocess.Popen(*args, start_new_session=True, **kw)
+            try:
+                for rlimit, limits in self._get_rlimits():
+                    resource.prlimit(proc.pid, rlimit, limits)
+            except OSError:
+                # It has exited already.
+                pass
+        self._processes = list(self._processes) + [proc]
+        if self._killed:
+            # The check was given up on while this was being started.
+            self.kill_processes()
+        return proc
+
+    def kill_processes(self):
+        """Kill the processes started for the test case that are still
+        running, along with those they started, and any started from now on.
+        """
+        self._killed = True
+        for proc in self._processes:
+            if proc.poll() is None:
+                try:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                except OSError:
+                    pass
+
+    def _limit_session(self):
+        """Like `_limit_process`, for an interpreter kept running across
+        jobs, whose CPU time adds up over them so is not limited.
+        """
+        self._limit_process(exclude=('cpu',))
+
     def _run_command(self, cmd_args, *args, **kw):
         """Run a command in a subprocess while blocking, the process is killed
-        if it takes more than 2 seconds to run.  Return the Popen object, the
-        stdout and stderr.
+        if it takes more than `check_timeout` seconds to run or on a
+        `TimeoutException`.  Return the Popen object, the stdout and stderr.
         """
         try:
-            proc = subprocess.Popen(cmd_args,
-                                    preexec_fn=os.setpgrp, *args, **kw)
-            stdout, stderr = proc.communicate()
+            proc = self._popen(cmd_args, *args, **kw)
+            stdout, stderr, cut = self._communicate(proc)
+        except subprocess.TimeoutExpired:
+            os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
+            proc.wait()
+            raise TimeoutException('Code took too long to run.')
         except TimeoutException:
             # Runaway code, so kill it.
             os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
@@ -40,6 +145,120 @@ class BaseEvaluator(object):
             raise
         return proc, stdout.decode('utf-8'), stderr.decode('utf-8')
 
+    def _communicate(self, proc, input=None, expected_lines=None):
+        """Like `proc.communicate` but read the output as it is written, and
+        stop reading once there are more than `output_limit` bytes of it or,
+        when `expected_lines` is given, as soon as a complete line on stdout
+        is not the expected one or there are more lines than expected.  The
+        process is then killed.
+
+        Returns a tuple (stdout, stderr, cut) with the bytes read, at most
+        `output_limit` of each, and whether the output was cut short.
+        Raises `subprocess.TimeoutExpired` when the process runs for more
+        than `check_timeout` seconds.
+        """
+        deadline = None
+        if self.check_timeout is not None:
+            deadline = time.time() + self.check_timeout
+        output = {}
+        selector = selectors.DefaultSelector()
+        if proc.stdin:
+            if input:
+                selector.register(proc.stdin, selectors.EVENT_WRITE)
+            else:
+                proc.stdin.close()
+        for pipe in (proc.stdout, proc.stderr):
+            if pipe:
+                selector.register(pipe, selectors.EVENT_READ)
+                output[pipe] = []
+        size = lines = offset = 0
+        pending = b''
+        cut = False
+        try:
+            while selector.get_map() and not cut:
+                timeout = None
+                if deadline is not None:
+                    timeout = deadline - time.time()
+                    if timeout <= 0:
+                        raise subprocess.TimeoutExpired(proc.args,
+                                                        self.check_timeout)
+                for key, events in selector.select(timeout):
+                    pipe = key.fileobj
+                    if pipe is proc.stdin:
+                        try:
+                            offset += os.write(key.fd,
+                                               input[offset:offset + 512])
+                        except BrokenPipeError:
+                            offset = len(input)
+                        if offset >= len(input):
+                            selector.unregister(pipe)
+                            pipe.close()
+                        continue
+                    data = os.read(key.fd, 32768)
+                    if not data:
+                        selector.unregister(pipe)
+                        pipe.close()
+                        continue
+                    output[pipe].append(data)
+                    size += len(data)
+                    if size > self.output_limit:
+                        cut = True
+                        break
+                    if pipe is proc.stdout and expected_lines is not None:
+                        pending += data
+                        end = pending.rfind(b'\n') + 1
+                        if not end:
+                            continue
+                        # Split as the whole output will be when it is
+                        # compared, no character is split by a newline.
+                        complete = pending[:end].decode('utf-8', 'ignore')\
+                            .splitlines()
+                        pending = pending[end:]
+                        if complete != expected_lines[lines:lines +
+                                                      len(complete)]:
+                            cut = True
+                            break
+                        lines += len(complete)
+        finally:
+            selector.close()
+        if cut:
+            os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
+            for pipe in output:
+                pipe.close()
+        if deadline is None:
+            proc.wait()
+        else:
+            proc.wait(timeout=max(deadline - time.time(), 0))
+
+        def join(pipe):
+            data = b''.join(output.get(pipe, []))
+            if cut:
+                # Drop any character split by the limit.
+                data = data[:self.output_limit].decode('utf-8', 'ignore')\
+                    .encode('utf-8')
+            return data
+        return join(proc.stdout), join(proc.stderr), cut
+
+    def _run_command_once(self, cmd_args, *args, **kw):
+        """Like `_run_command` but run a given command only once for a
+        submission, the other test cases get the result of that run.  This is
+        meant for compiling the user's answer, which is the same for every
+        test case.
+        """
+        if self.compile_cache is None:
+            return self._run_command(cmd_args, *args, **kw)
+        key = (str(cmd_args), self.user_answer)
+        if key not in self.compile_cache:
+            self.compile_cache[key] = self._run_command(cmd_args, *args, **kw)
+        return self.compile_cache[key]
+
+    def _has_run_once(self, cmd_args):
+        """Returns whether `_run_command_once` already ran `cmd_args` for this
+        submission.
+        """
+        return self.compile_cache is not None and \
+            (str(cmd_args), self.user_answer) in self.compile_cache
+
     def _remove_null_substitute_char(self, string):
         """Returns a string without any null and substitute characters"""
         stripped = ""
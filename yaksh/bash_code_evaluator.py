@@ -7,6 +7,8 @@ import subprocess
 # local imports
 from .base_evaluator import BaseEvaluator
 from .file_utils import copy_files, delete_files
+from .interpreter_session import BashSession
+from .settings import BASH_BATCH
 
 
 class BashCodeEvaluator(BaseEvaluator):
@@ -40,6 +42,23 @@ class BashCodeEvaluator(BaseEvaluator):
         if self.files:
             delete_files(self.files)
 
+    def _run_script(self, script_path, args, session=None):
+        """Run a script with `args`, in `session` if one is given, and
+        return its stdout and stderr.
+        """
+        if session is not None:
+            status, stdout, stderr = session.run(
+                script_path, args, self.check_timeout, self._limit_process
+            )
+            return stdout, stderr
+        ret = self._run_command(["bash", script_path] + args,
+                                stdin=None,
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE
+                                )
+        proc, stdout, stderr = ret
+        return stdout, stderr
+
     def check_code(self):
         """ Function validates student script using instructor script as
         reference. Test cases can optionally be provided.  The first argument
@@ -134,28 +153,25 @@ class BashCodeEvaluator(BaseEvaluator):
             loop_count = 0
             test_cases = open(clean_test_case_path).readlines()
             num_lines = len(test_cases)
-            for tc in test_cases:
-                loop_count += 1
-                if valid_answer:
-                    args = ["bash", clean_ref_code_path] + \
-                        [x for x in tc.split()]
-                    ret = self._run_command(args,
-                                            stdin=None,
-                                            stdout=subprocess.PIPE,
-                                            stderr=subprocess.PIPE
-                                            )
-                    proc, inst_stdout, inst_stderr = ret
-                    if self.file_paths:
-                        self.files = copy_files(self.file_paths)
-                    args = ["bash", self.submit_code_path] + \
-                        [x for x in tc.split()]
-                    ret = self._run_command(args,
-                                            stdin=None,
-                                            stdout=subprocess.PIPE,
-                                            stderr=subprocess.PIPE
-                                            )
-                    proc, stdnt_stdout, stdnt_stderr = ret
-                    valid_answer = inst_stdout == stdnt_stdout
+            session = None
+            if BASH_BATCH and not self.file_paths:
+                session = BashSession()
+            try:
+                for tc in test_cases:
+                    loop_count += 1
+                    if valid_answer:
+                        inst_stdout, inst_stderr = self._run_script(
+                            clean_ref_code_path, tc.split(), session
+                        )
+                        if self.file_paths:
+                            self.files = copy_files(self.file_paths)
+                        stdnt_stdout, stdnt_stderr = self._run_script(
+                            self.submit_code_path, tc.split(), session
+                        )
+                        valid_answer = inst_stdout == stdnt_stdout
+            finally:
+                if session is not None:
+                    session.close()
             if valid_answer and (num_lines == loop_count):
                 mark_fraction = 1.0 if self.partial_grading else 0.0
                 return True, None, mark_fraction
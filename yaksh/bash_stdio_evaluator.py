@@ -26,7 +26,8 @@ class BashStdIOEvaluator(StdIOEvaluator):
         self.hidden = test_case_data.get('hidden')
 
     def teardown(self):
-        os.remove(self.submit_code_path)
+        if os.path.exists(self.submit_code_path):
+            os.remove(self.submit_code_path)
         if self.files:
             delete_files(self.files)
 
@@ -45,13 +46,12 @@ class BashStdIOEvaluator(StdIOEvaluator):
         mark_fraction = 0.0
 
         self.expected_input = str(self.expected_input).replace('\r', '')
-        proc = subprocess.Popen("bash ./Test.sh",
-                                shell=True,
-                                stdin=subprocess.PIPE,
-                                stdout=subprocess.PIPE,
-                                stderr=subprocess.PIPE,
-                                preexec_fn=os.setpgrp
-                                )
+        proc = self._popen("bash ./Test.sh",
+                           shell=True,
+                           stdin=subprocess.PIPE,
+                           stdout=subprocess.PIPE,
+                           stderr=subprocess.PIPE
+                           )
         success, err = self.evaluate_stdio(self.user_answer, proc,
                                            self.expected_input,
                                            self.expected_output
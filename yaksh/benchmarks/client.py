@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""Benchmark submit + poll round trips per second against a server pool.
+
+The "before" figure uses bare `requests.post`/`requests.get` calls, which
+open a new connection every time, as the code server clients used to.  The
+"after" figure goes through a `CodeServerClient`, which keeps the connection
+to the pool alive.  The pool is started without workers so only the HTTP
+round trip is measured.
+
+Run it with::
+
+    $ python -m yaksh.benchmarks.client -n 2000
+
+"""
+from __future__ import print_function, unicode_literals
+from argparse import ArgumentParser
+import json
+from multiprocessing import Process
+import time
+import urllib
+
+import requests
+
+from yaksh.code_server import ServerPool, CodeServerClient
+
+
+def run_pool(port):
+    ServerPool(n=0, pool_port=port).run()
+
+
+def bare_round_trip(url, uid):
+    requests.post(url, data=dict(uid=uid, json_data='{}', user_dir=''))
+    r = requests.get(urllib.parse.urljoin(url, uid))
+    return json.loads(r.content.decode('utf-8'))
+
+
+def _time_round_trips(round_trip, url, n):
+    start = time.time()
+    for i in range(n):
+        round_trip(url, str(i))
+    return n/(time.time() - start)
+
+
+def main(args=None):
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '-n', '--round-trips', dest='round_trips', type=int, default=1000,
+        help="Number of submit + poll round trips to time."
+    )
+    parser.add_argument(
+        '-p', '--port', dest='port', type=int, default=55599,
+        help="Free port on which the benchmark pool can listen."
+    )
+    options = parser.parse_args(args)
+    url = 'http://localhost:%s' % options.port
+
+    pool = Process(target=run_pool, args=(options.port,))
+    pool.start()
+    try:
+        client = CodeServerClient(url)
+        # Wait for the pool to come up, the client retries refused
+        # connections.
+        client.get_result('0')
+
+        def pooled_round_trip(url, uid):
+            client.submit(uid, '{}', '')
+            return client.get_result(uid)
+
+        before = _time_round_trips(bare_round_trip, url, options.round_trips)
+        after = _time_round_trips(pooled_round_trip, url, options.round_trips)
+    finally:
+        pool.terminate()
+        pool.join()
+    print("requests.post/get:  %8.0f round trips/s" % before)
+    print("CodeServerClient:   %8.0f round trips/s" % after)
+    print("Speedup:            %8.1fx" % (after/before))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""Benchmark the number of result polls per second the code server pool can
+answer over HTTP.
+
+Each figure polls a running pool for the results of jobs it holds, one GET
+after another over a single keep-alive `CodeServerClient` connection, as the
+web application does.  The "before" pool stores its results in a
+`multiprocessing.Manager` dict, which is how `ServerPool` used to store
+them, so every poll is also a round trip to the manager process.  The
+"after" pool is a plain `ServerPool`, which reads them from the table held
+by the tornado process.  Both pools are started without workers so only
+answering polls is measured.
+
+Run it with::
+
+    $ python -m yaksh.benchmarks.result_store -n 5000
+
+"""
+from __future__ import print_function, unicode_literals
+from argparse import ArgumentParser
+from multiprocessing import Manager, Process
+import time
+
+from yaksh.code_server import ServerPool, CodeServerClient
+
+
+def run_pool(port, polls, results=None):
+    server_pool = ServerPool(n=0, pool_port=port)
+    if results is not None:
+        server_pool.results = results
+    for i in range(polls):
+        server_pool.results[str(i)] = dict(status='not started')
+    server_pool.run()
+
+
+def bench_pool(port, polls, results=None):
+    """Returns the polls per second answered by a pool keeping its results
+    in `results`, its own table when None.
+    """
+    pool = Process(target=run_pool, args=(port, polls, results))
+    pool.start()
+    try:
+        client = CodeServerClient('http://localhost:%s' % port)
+        # Wait for the pool to come up, the client retries refused
+        # connections.
+        client.get_result('unknown')
+        start = time.time()
+        for i in range(polls):
+            client.get_result(str(i))
+        return polls/(time.time() - start)
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def main(args=None):
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '-n', '--polls', dest='polls', type=int, default=5000,
+        help="Number of polls to time."
+    )
+    parser.add_argument(
+        '-p', '--port', dest='port', type=int, default=55599,
+        help="Free port on which the benchmark pools can listen."
+    )
+    options = parser.parse_args(args)
+
+    manager = Manager()
+    try:
+        before = bench_pool(options.port, options.polls, manager.dict())
+    finally:
+        manager.shutdown()
+    after = bench_pool(options.port, options.polls)
+    print("Manager dict: %10.0f polls/s" % before)
+    print("ServerPool:   %10.0f polls/s" % after)
+    print("Speedup:      %10.1fx" % (after/before))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""Benchmark the Python submissions a single core evaluates per second.
+
+Three ways of running a submission are timed, one after the other:
+
+- a fresh interpreter started for every submission, the cost of isolating
+  jobs without a warm process to fork from;
+- a child forked from a warmed up code server process, which is what
+  `FORK_PER_JOB` does;
+- the code server process itself, which is fastest but shares its state with
+  every answer it ever evaluated.
+
+Run it with::
+
+    $ python -m yaksh.benchmarks.sandbox -n 200
+
+"""
+from __future__ import print_function, unicode_literals
+from argparse import ArgumentParser
+import json
+import subprocess
+import sys
+import tempfile
+import time
+
+from yaksh.code_server import warm_up, evaluate_in_child
+from yaksh.grader import Grader
+
+
+SUBMISSION = {
+    'metadata': {
+        'user_answer': 'def add(a, b):\n    return a + b\n',
+        'language': 'python',
+        'partial_grading': False
+    },
+    'test_case_data': [
+        {'test_case': 'assert_equal(add(1, 2), 3)',
+         'test_case_type': 'standardtestcase', 'weight': 1.0},
+        {'test_case': 'assert add(-1, 1) == 0',
+         'test_case_type': 'standardtestcase', 'weight': 1.0},
+    ]
+}
+
+COLD_START = (
+    "import json, sys\n"
+    "from yaksh.grader import Grader\n"
+    "print(json.dumps(Grader(sys.argv[2]).evaluate(json.loads(sys.argv[1]))))"
+)
+
+
+def evaluate_cold(data, user_dir):
+    output = subprocess.check_output(
+        [sys.executable, '-c', COLD_START, json.dumps(data), user_dir]
+    )
+    return json.loads(output.decode('utf-8'))
+
+
+def evaluate_in_process(data, user_dir):
+    return Grader(user_dir).evaluate(data)
+
+
+def _time_submissions(evaluate, n, user_dir):
+    start = time.time()
+    for i in range(n):
+        result = evaluate(SUBMISSION, user_dir)
+        assert result['success'], result
+    return n/(time.time() - start)
+
+
+def main(args=None):
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '-n', '--submissions', dest='submissions', type=int, default=100,
+        help="Number of submissions to time for each way of running them."
+    )
+    options = parser.parse_args(args)
+    n = options.submissions
+    user_dir = tempfile.mkdtemp()
+
+    warm_up()
+    cold = _time_submissions(evaluate_cold, max(n//10, 1), user_dir)
+    forked = _time_submissions(evaluate_in_child, n, user_dir)
+    in_process = _time_submissions(evaluate_in_process, n, user_dir)
+    print("Fresh interpreter:  %8.1f submissions/s" % cold)
+    print("Forked warm child:  %8.1f submissions/s" % forked)
+    print("In process:         %8.1f submissions/s" % in_process)
+    print("Fork vs fresh:      %8.1fx" % (forked/cold))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""Benchmark how long a code server process takes to answer its first job.
+
+Each figure comes from fresh interpreters, so that nothing has been imported
+yet.  "Cold" answers the first job straight away, loading the evaluators it
+needs on the way, as code server processes used to.  "Preload" first warms
+up with `yaksh.code_server.warm_up`, as code server processes now do when
+they start, and then answers the job.  Lookups of evaluator classes in the
+language registry are timed as well.
+
+Run it with::
+
+    $ python -m yaksh.benchmarks.worker_startup -n 10
+
+"""
+from __future__ import print_function, unicode_literals
+from argparse import ArgumentParser
+import json
+import subprocess
+import sys
+import tempfile
+import time
+
+from yaksh.language_registry import get_registry
+
+FIRST_JOB = """
+import json, sys, time
+start = time.time()
+from yaksh.code_server import warm_up
+from yaksh.grader import Grader
+if sys.argv[1] == 'preload':
+    warm_up()
+started = time.time()
+data = {
+    'metadata': {'user_answer': 'def f():\\n    return 1\\n',
+                 'language': 'python', 'partial_grading': False},
+    'test_case_data': [{'test_case': 'assert_equal(f(), 1)',
+                        'test_case_type': 'standardtestcase', 'weight': 1.0}]
+}
+assert Grader(sys.argv[2]).evaluate(data)['success']
+print(json.dumps([started - start, time.time() - started]))
+"""
+
+
+def time_first_job(mode, n, user_dir):
+    """Returns the mean seconds taken to start and to answer the first job.
+    """
+    start_up, first_job = 0.0, 0.0
+    for i in range(n):
+        output = subprocess.check_output(
+            [sys.executable, '-c', FIRST_JOB, mode, user_dir]
+        )
+        times = json.loads(output.decode('utf-8'))
+        start_up += times[0]
+        first_job += times[1]
+    return start_up/n, first_job/n
+
+
+def time_lookups(n):
+    registry = get_registry()
+    registry.preload()
+    start = time.time()
+    for i in range(n):
+        registry.get_class('python', 'standardtestcase')
+    return n/(time.time() - start)
+
+
+def main(args=None):
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '-n', '--starts', dest='starts', type=int, default=5,
+        help="Number of process starts to average over."
+    )
+    options = parser.parse_args(args)
+    user_dir = tempfile.mkdtemp()
+
+    for mode in ('cold', 'preload'):
+        start_up, first_job = time_first_job(mode, options.starts, user_dir)
+        print("%-10s start %7.1f ms, first job %7.1f ms" % (
+            mode.capitalize() + ':', start_up*1000, first_job*1000
+        ))
+    print("Registry lookups: %10.0f /s" % time_lookups(100000))
+
+
+if __name__ == '__main__':
+    main()
@@ -13,8 +13,11 @@ run as many servers as desired.
 # Standard library imports
 from __future__ import unicode_literals
 from argparse import ArgumentParser
+import hashlib
 import json
-from multiprocessing import Process, Queue, Manager
+import logging
+from collections import deque, OrderedDict
+from multiprocessing import Process, Pipe
 import os
 from os.path import dirname, abspath
 try:
@@ -23,19 +26,44 @@ except ImportError:
     pass
 import sys
 import time
+from datetime import timedelta
+from functools import partial
 
 # Library imports
+import psutil
 import requests
-from tornado.ioloop import IOLoop
-from tornado.web import Application, RequestHandler
+from requests.adapters import HTTPAdapter
+from tornado import gen
+from tornado.concurrent import Future
+from tornado.ioloop import IOLoop, PeriodicCallback
+from tornado.web import Application, RequestHandler, HTTPError
 import urllib
+from urllib3.util.retry import Retry
 
 # Local imports
-from .settings import N_CODE_SERVERS, SERVER_POOL_PORT
+from .settings import (
+    N_CODE_SERVERS, SERVER_POOL_PORT, RESULT_WAIT_TIMEOUT,
+    POOL_CONNECT_TIMEOUT, POOL_READ_TIMEOUT, POOL_CONNECT_RETRIES,
+    POOL_RETRY_BACKOFF, MIN_CODE_SERVERS, MAX_CODE_SERVERS, SCALE_INTERVAL,
+    SCALE_UP_WAIT, SCALE_DOWN_IDLE, SERVER_TIMEOUT, WORKER_HANG_MARGIN,
+    SUPERVISE_INTERVAL, RESULT_TTL, MAX_RESULTS, RESULT_EXPIRE_INTERVAL,
+    FORK_PER_JOB, DEDUP_TTL, DEDUP_MAX_ENTRIES
+)
+from .file_cache import support_file_cache
 from .grader import Grader
+from .language_registry import get_registry
+from .code_server_metrics import PoolMetrics
 
 
 MY_DIR = abspath(dirname(__file__))
+logger = logging.getLogger(__name__)
+
+# Lanes jobs are queued in, most urgent first.  Workers always take the next
+# job from the first lane that is not empty, so background work such as
+# regrading never holds up students submitting code.
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+LANES = (INTERACTIVE, BACKGROUND)
 
 
 # Private Protocol ##########
@@ -47,16 +75,140 @@ def run_as_nobody():
     os.seteuid(nobody.pw_uid)
 
 
-def check_code(pid, job_queue, results):
-    """Check the code, this runs forever.
+def warm_up():
+    """Import the evaluators and what they need, so that neither the first
+    job nor processes forked from this one pay for it.
+    """
+    get_registry().preload()
+    try:
+        from .python_assertion_evaluator import get_nose_tools
+        get_nose_tools()
+    except ImportError:
+        logger.exception("Could not import nose.tools")
+
+
+def evaluate_in_child(data, user_dir):
+    """Evaluate a job in a child forked from this process and return the
+    result.  The child is thrown away afterwards, so nothing the answer does
+    outlives the job.
+    """
+    read_end, write_end = os.pipe()
+    child = os.fork()
+    if child == 0:
+        os.close(read_end)
+        status = 1
+        try:
+            result = Grader(user_dir).evaluate(data)
+            with os.fdopen(write_end, 'wb') as f:
+                f.write(json.dumps(result).encode('utf-8'))
+            status = 0
+        finally:
+            os._exit(status)
+    os.close(write_end)
+    with os.fdopen(read_end, 'rb') as f:
+        output = f.read()
+    pid, status = os.waitpid(child, 0)
+    if not output:
+        if os.WIFSIGNALED(status):
+            msg = 'Process was killed by signal %s.' % os.WTERMSIG(status)
+        else:
+            msg = 'Process ended with exit code %s.' % os.WEXITSTATUS(status)
+        return dict(success=False, weight=0.0, error=[msg])
+    return json.loads(output.decode('utf-8'))
+
+
+def _get_file_digest(path):
+    if os.path.isfile(path):
+        return support_file_cache.get_digest(path)
+    return path
+
+
+def get_submission_digest(json_data):
+    """Returns a digest of a job's data, the same for submissions that are
+    bound to get the same result.  Files are taken into account by their
+    content when they are on this machine, by their URL otherwise.
+    """
+    try:
+        data = json.loads(json_data)
+    except ValueError:
+        return hashlib.sha256(json_data.encode('utf-8')).hexdigest()
+    metadata = data.get('metadata') or {}
+    if metadata.get('file_paths'):
+        metadata['file_paths'] = [
+            [_get_file_digest(path), extract]
+            for path, extract in metadata['file_paths']
+        ]
+    if metadata.get('assign_files'):
+        metadata['assign_files'] = [
+            _get_file_digest(path) for path in metadata['assign_files']
+        ]
+    return hashlib.sha256(
+        json.dumps(data, sort_keys=True).encode('utf-8')
+    ).hexdigest()
+
+
+def get_wait(value):
+    """Returns the seconds to wait for a result asked for with `value`,
+    between 0 and RESULT_WAIT_TIMEOUT.  Raises a 400 when it is not a number.
+    """
+    try:
+        wait = float(value)
+    except ValueError:
+        raise HTTPError(400, 'wait must be a number of seconds')
+    if not wait > 0:
+        # Negative or not a number at all.
+        return 0
+    return min(wait, RESULT_WAIT_TIMEOUT)
+
+
+def check_code(pid, pipe, pool_pipes=None, pool_ends=None):
+    """Check the code, this runs till the pool closes its end of `pipe`.
+
+    Jobs are received from the pool over `pipe`, the worker's end of a pipe
+    owned by this worker alone, and results are sent back as
+    `(uid, result, stats)` tuples, `stats` being what the pool's metrics need
+    to know about the job.  The worker ends of other workers' pipes
+    inherited from the pool, `pool_pipes`, are closed so that those workers
+    exiting shows up as an EOF in the pool.  So are the pool's own ends,
+    `pool_ends`, so that the pool exiting shows up as an EOF here and the
+    worker does not outlive it.
     """
+    for other in (pool_pipes or {}).values():
+        if other is not pipe:
+            other.close()
+    for pool_end in (pool_ends or {}).values():
+        pool_end.close()
+    warm_up()
     while True:
-        uid, json_data, user_dir = job_queue.get(True)
-        results[uid] = dict(status='running', pid=pid, result=None)
+        try:
+            job = pipe.recv()
+        except EOFError:
+            break
+        if job is None:
+            # The pool is retiring this worker.
+            break
+        uid, json_data, user_dir = job
+        start = time.time()
         data = json.loads(json_data)
-        grader = Grader(user_dir)
-        result = grader.evaluate(data)
-        results[uid] = dict(status='done', result=json.dumps(result))
+        if FORK_PER_JOB:
+            result = evaluate_in_child(data, user_dir)
+        else:
+            grader = Grader(user_dir)
+            result = grader.evaluate(data)
+        test_cases = data.get('test_case_data') or [{}]
+        stats = dict(
+            duration=time.time() - start,
+            language=data.get('metadata', {}).get('language', 'unknown'),
+            test_case_type=test_cases[0].get('test_case_type', 'none'),
+            timed_out=any(
+                isinstance(err, dict) and
+                err.get('exception') == 'TimeoutException'
+                for err in result.get('error', [])
+            ),
+            timings=result.get('timings')
+        )
+        pipe.send((uid, dict(status='done', result=json.dumps(result)),
+                   stats))
 
 
 ###############################################################################
@@ -64,29 +216,67 @@ def check_code(pid, job_queue, results):
 ###############################################################################
 class ServerPool(object):
     """Manages a pool of processes checking code."""
-    def __init__(self, n, pool_port=50000):
+    def __init__(self, n, pool_port=50000, min_n=None, max_n=None):
         """Create a pool of servers.
 
         Parameters
         ----------
 
         n : int
-            Number of code servers to run
+            Number of code servers to start with.
 
         pool_port : int
             Port at which the server pool should serve.
+
+        min_n, max_n : int
+            Bounds within which the number of code servers is scaled with
+            the load, they are widened to include `n` if need be.  Both
+            default to `n`, which keeps the pool at a fixed size.
         """
         self.n = n
-        self.manager = Manager()
-        self.results = self.manager.dict()
+        self.min_n = n if min_n is None else min(min_n, n)
+        self.max_n = n if max_n is None else max(max_n, n)
+        # The results table lives in this (the tornado) process and is only
+        # written to from the IOLoop, the workers report back over pipes.
+        self.results = {}
+        # When each finished result that is yet to be read was done, oldest
+        # first.  Results nobody reads are dropped after RESULT_TTL seconds
+        # or once more than MAX_RESULTS are held.
+        self.done = OrderedDict()
+        self.pipes = {}
+        self._worker_pipes = {}
+        # Jobs waiting for a worker, one queue per lane.
+        self.lanes = OrderedDict((lane, deque()) for lane in LANES)
+        # pids of the workers waiting for a job.
+        self.idle = deque()
+        # uid of the job each worker is running and when it was handed the
+        # job, keyed by pid.
+        self.busy = {}
+        self.started = {}
+        # Futures of the requests long-polling for a uid to finish.
+        self.waiters = {}
+        # Recent (time, from, to) changes in the number of workers.
+        self.scale_events = deque(maxlen=10)
+        self._retired = []
+        self._last_pressure = time.time()
+        self.metrics = PoolMetrics()
+        # Results of recent submissions keyed by their digest, oldest first,
+        # as (time, result, seconds taken) tuples.  Used for DEDUP_TTL
+        # seconds, or never when that is zero.
+        self.dedup_ttl = DEDUP_TTL
+        self.dedup = OrderedDict()
+        # uids of the submissions waiting for the one being evaluated with
+        # the same digest, the latter first, and the digest of the job each
+        # worker is running, keyed by pid.
+        self.in_flight = {}
+        self.job_digests = {}
         self.my_port = pool_port
 
-        self.job_queue = Queue()
-        processes = []
+        processes = {}
         for i in range(n):
-            p = self._make_process(i)
-            processes.append(p)
+            processes[i] = self._make_process(i)
         self.processes = processes
+        self._next_pid = n
         self.app = self._make_app()
 
     def _make_app(self):
@@ -97,55 +287,363 @@ class ServerPool(object):
         return app
 
     def _make_process(self, pid):
+        pool_end, worker_end = Pipe()
+        self.pipes[pid] = pool_end
+        self._worker_pipes[pid] = worker_end
         return Process(
-            target=check_code, args=(pid, self.job_queue, self.results)
+            target=check_code,
+            args=(pid, worker_end, self._worker_pipes, self.pipes)
         )
 
+    def _start_process(self, pid):
+        proc = self.processes[pid]
+        proc.start()
+        # Only the worker may hold its end, so that its exit shows up as an
+        # EOF on ours.
+        self._worker_pipes.pop(pid).close()
+        IOLoop.current().add_handler(
+            self.pipes[pid], partial(self._read_results, pid),
+            IOLoop.READ
+        )
+        self.idle.append(pid)
+
     def _start_code_servers(self):
-        for proc in self.processes:
+        for pid, proc in self.processes.items():
             if proc.pid is None:
-                proc.start()
+                self._start_process(pid)
+        self._dispatch()
+
+    def _add_process(self):
+        pid = self._next_pid
+        self._next_pid += 1
+        self.processes[pid] = self._make_process(pid)
+        self._start_process(pid)
+
+    def _retire_process(self, pid):
+        """Ask an idle worker to exit, it is reaped later on."""
+        self.idle.remove(pid)
+        proc = self.processes.pop(pid)
+        pipe = self.pipes.pop(pid)
+        IOLoop.current().remove_handler(pipe)
+        pipe.send(None)
+        pipe.close()
+        self._retired.append(proc)
+
+    def _oldest_wait(self, now):
+        """Seconds the longest queued job has been waiting."""
+        return max(
+            [now - jobs[0][1] for jobs in self.lanes.values() if jobs] or [0]
+        )
+
+    def _autoscale(self):
+        """Grow the pool when jobs queue up, shrink it when it is idle."""
+        now = time.time()
+        for proc in self._retired:
+            proc.join(0)
+        self._retired = [p for p in self._retired if p.is_alive()]
+        n = len(self.processes)
+        q_size = sum(len(jobs) for jobs in self.lanes.values())
+        if q_size or not self.idle:
+            self._last_pressure = now
+        if q_size and n < self.max_n and \
+                (self._oldest_wait(now) >= SCALE_UP_WAIT or q_size > n):
+            for i in range(min(q_size, self.max_n - n)):
+                self._add_process()
+            self.scale_events.append((now, n, len(self.processes)))
+            self._dispatch()
+        elif n > self.min_n and self.idle and \
+                now - self._last_pressure >= SCALE_DOWN_IDLE:
+            # Shrink one worker at a time.
+            self._retire_process(self.idle[-1])
+            self.scale_events.append((now, n, len(self.processes)))
+
+    def _dispatch(self):
+        """Hand queued jobs to idle workers, most urgent lane first."""
+        while self.idle:
+            name = next(
+                (name for name, jobs in self.lanes.items() if jobs), None
+            )
+            if name is None:
+                break
+            pid = self.idle.popleft()
+            job, queued_at, digest = self.lanes[name].popleft()
+            self.metrics.jobs_started.inc(lane=name)
+            uid = job[0]
+            self.busy[pid] = uid
+            if digest is not None:
+                self.job_digests[pid] = digest
+            self.started[pid] = time.time()
+            self.results[uid] = dict(status='running', pid=pid, result=None)
+            self.pipes[pid].send(job)
+
+    def _read_results(self, pid, pipe, events):
+        """Drain the results a worker has sent down its pipe."""
+        while pipe.poll():
+            try:
+                uid, result, stats = pipe.recv()
+            except EOFError:
+                self._handle_worker_exit(pid)
+                return
+            self.metrics.observe_job(stats)
+            self.busy.pop(pid, None)
+            self.started.pop(pid, None)
+            self.idle.append(pid)
+            self._set_result(uid, result)
+            self._share_result(self.job_digests.pop(pid, None), result,
+                               stats)
+        self._dispatch()
+
+    def _promote(self, digest, lane):
+        """Move the queued job with `digest` up to `lane`, if it is queued in
+        a less urgent one, so that those waiting for it in `lane` do not wait
+        behind the less urgent jobs.
+        """
+        for name in LANES[LANES.index(lane) + 1:]:
+            jobs = self.lanes[name]
+            for entry in jobs:
+                if entry[2] == digest:
+                    jobs.remove(entry)
+                    self.lanes[lane].append(entry)
+                    return
+
+    def _deduplicate(self, uid, digest, lane=INTERACTIVE):
+        """Give the job `uid`, submitted in `lane`, the result of an
+        identical submission, one with the same `digest`, returns whether it
+        has, or will have once that one is done.
+        """
+        cached = self.dedup.get(digest)
+        if cached is not None and cached[0] > time.time() - self.dedup_ttl:
+            done_at, result, duration = cached
+            self.metrics.dedup_hits.inc()
+            self.metrics.dedup_saved.inc(duration)
+            self._set_result(uid, dict(status='done', result=result))
+            return True
+        if digest in self.in_flight:
+            self.metrics.dedup_hits.inc()
+            self._promote(digest, lane)
+            self.in_flight[digest].append(uid)
+            self.results[uid] = dict(status='not started')
+            return True
+        self.metrics.dedup_misses.inc()
+        self.in_flight[digest] = [uid]
+        return False
+
+    def _share_result(self, digest, result, stats=None):
+        """Pass the result of the job with `digest` on to the identical
+        submissions waiting for it, and keep it for later ones unless the
+        job failed to run or timed out.
+        """
+        if digest is None:
+            return
+        waiting = self.in_flight.pop(digest, [])[1:]
+        if stats is not None and not stats['timed_out']:
+            self.dedup.pop(digest, None)
+            self.dedup[digest] = (
+                time.time(), result['result'], stats['duration']
+            )
+            while len(self.dedup) > DEDUP_MAX_ENTRIES:
+                self.dedup.popitem(last=False)
+        for other in waiting:
+            if stats is not None:
+                self.metrics.dedup_saved.inc(stats['duration'])
+            self._set_result(other, dict(status='done',
+                                         result=result['result']))
+
+    def _set_result(self, uid, result):
+        self.results[uid] = result
+        if result.get('status') == 'done':
+            self.done.pop(uid, None)
+            self.done[uid] = time.time()
+            while len(self.done) > MAX_RESULTS:
+                self._drop_result(next(iter(self.done)))
+            for future in self.waiters.pop(uid, []):
+                if not future.done():
+                    future.set_result(None)
+
+    def _drop_result(self, uid):
+        self.done.pop(uid, None)
+        self.results.pop(uid, None)
+
+    def _expire_results(self):
+        """Drop the finished results nobody has read for RESULT_TTL seconds.
+        """
+        expire_before = time.time() - RESULT_TTL
+        while self.done:
+            uid, done_at = next(iter(self.done.items()))
+            if done_at > expire_before:
+                break
+            self._drop_result(uid)
+        dedup_before = time.time() - self.dedup_ttl
+        while self.dedup:
+            digest, (done_at, result, duration) = next(
+                iter(self.dedup.items())
+            )
+            if done_at > dedup_before:
+                break
+            self.dedup.popitem(last=False)
+
+    def _handle_worker_exit(self, pid):
+        proc = self.processes[pid]
+        proc.join(1)
+        if proc.is_alive():
+            # The pipe was closed from within the job, the worker can no
+            # longer report back so get rid of it.
+            proc.terminate()
+            proc.join(1)
+        self._restart_process(pid)
+
+    def _restart_process(self, pid, error=None):
+        """Replace a dead worker, failing the job it was running with
+        `error`, which defaults to the worker's exit code.
+        """
+        proc = self.processes[pid]
+        IOLoop.current().remove_handler(self.pipes[pid])
+        self.pipes[pid].close()
+        if pid in self.idle:
+            self.idle.remove(pid)
+        uid = self.busy.pop(pid, None)
+        self.started.pop(pid, None)
+        self.metrics.restarts.inc(reason='exit' if error is None else 'hang')
+        if error is None:
+            error = 'Process ended with exit code %s.' % proc.exitcode
+        result = dict(status='done', result=json.dumps(dict(
+            success=False, weight=0.0, error=[error]
+        )))
+        if uid in self.results:
+            self._set_result(uid, result)
+        # Whoever waits on the same digest must not wait forever either.
+        self._share_result(self.job_digests.pop(pid, None), result)
+        self.processes[pid] = self._make_process(pid)
+        self._start_process(pid)
+        self._dispatch()
+
+    def _kill_process(self, proc):
+        """Kill a worker along with any processes its job started."""
+        try:
+            worker = psutil.Process(proc.pid)
+            procs = worker.children(recursive=True) + [worker]
+        except psutil.NoSuchProcess:
+            procs = []
+        for p in procs:
+            try:
+                p.kill()
+            except psutil.NoSuchProcess:
+                pass
+        proc.join(1)
+
+    def _supervise(self):
+        """Replace workers that have died or hung.
+
+        A worker is taken to have hung when it has been on one job for
+        longer than the grader's own timeout, plus some margin.
+        """
+        now = time.time()
+        for pid, proc in list(self.processes.items()):
+            started = self.started.get(pid)
+            if not proc.is_alive():
+                self._restart_process(pid)
+            elif started and now - started > SERVER_TIMEOUT + \
+                    WORKER_HANG_MARGIN:
+                self._kill_process(proc)
+                self._restart_process(
+                    pid, 'Code server process stopped responding after '
+                    '%d seconds and was restarted.' % (now - started)
+                )
 
     def _handle_dead_process(self, result):
         if result.get('status') == 'running':
             pid = result.get('pid')
-            proc = self.processes[pid]
-            if not proc.is_alive():
+            proc = self.processes.get(pid)
+            if proc is not None and not proc.is_alive():
                 # If the processes is dead, something bad happened so
                 # restart that process.
-                new_proc = self._make_process(pid)
-                self.processes[pid] = new_proc
-                new_proc.start()
-                result['status'] = 'done'
-                result['result'] = json.dumps(dict(
-                    success=False, weight=0.0,
-                    error=['Process ended with exit code %s.'
-                           % proc.exitcode]
-                ))
+                self._restart_process(pid)
 
     # Public Protocol ##########
 
     def get_status(self):
-        """Returns current job queue size, total number of processes alive.
+        """Returns current job queue size, total number of processes alive
+        and the number of jobs running.  These are all read off counters kept
+        up to date as jobs move through the pool.
         """
-        qs = sum(r['status'] == 'not started'
-                 for r in self.results.values())
-        alive = sum(p.is_alive() for p in self.processes)
-        n_running = sum(r['status'] == 'running'
-                        for r in self.results.values())
+        qs = sum(len(jobs) for jobs in self.lanes.values())
+        alive = sum(p.is_alive() for p in self.processes.values())
+        n_running = len(self.busy)
 
         return qs, alive, n_running
 
-    def submit(self, uid, json_data, user_dir):
-        self.results[uid] = dict(status='not started')
-        self.job_queue.put((uid, json_data, user_dir))
+    def get_unread_count(self):
+        """Returns the number of finished results waiting to be read."""
+        return len(self.done)
 
-    def get_result(self, uid):
+    def get_dedup_stats(self):
+        """Returns the number of submissions given the result of an
+        identical one, the number evaluated, and the seconds of evaluation
+        saved.
+        """
+        return (self.metrics.dedup_hits.get(),
+                self.metrics.dedup_misses.get(),
+                self.metrics.dedup_saved.get())
+
+    def get_lane_sizes(self):
+        """Returns the number of jobs queued in each lane."""
+        return OrderedDict(
+            (lane, len(jobs)) for lane, jobs in self.lanes.items()
+        )
+
+    def submit(self, uid, json_data, user_dir, lane=INTERACTIVE):
+        self.done.pop(uid, None)
+        self.metrics.jobs_submitted.inc(lane=lane)
+        digest = None
+        if self.dedup_ttl > 0:
+            digest = get_submission_digest(json_data)
+            if self._deduplicate(uid, digest, lane):
+                return
+        self.results[uid] = dict(status='not started')
+        self.lanes[lane].append(
+            ((uid, json_data, user_dir), time.time(), digest)
+        )
+        self._dispatch()
+
+    @gen.coroutine
+    def wait_for_result(self, uid, timeout):
+        """Wait at most `timeout` seconds for the job `uid` to be done."""
+        result = self.results.get(uid)
+        if result is None or result.get('status') == 'done':
+            return
+        future = Future()
+        self.waiters.setdefault(uid, []).append(future)
+        try:
+            yield gen.with_timeout(timedelta(seconds=timeout), future)
+        except gen.TimeoutError:
+            pass
+        finally:
+            waiters = self.waiters.get(uid, [])
+            if future in waiters:
+                waiters.remove(future)
+                if not waiters:
+                    self.waiters.pop(uid)
+
+    def _get_result(self, uid):
         result = self.results.get(uid, dict(status='unknown'))
         self._handle_dead_process(result)
+        # Restarting a dead worker sets the failure of its job.
+        result = self.results.get(uid, result)
         if result.get('status') == 'done':
-            self.results.pop(uid)
-        return json.dumps(result)
+            self._drop_result(uid)
+        return result
+
+    def get_metrics(self):
+        """Returns the pool's metrics in the Prometheus text format."""
+        return self.metrics.render(self)
+
+    def get_result(self, uid):
+        return json.dumps(self._get_result(uid))
+
+    def get_results(self, uids):
+        """Returns the results of several jobs as a json dict keyed by uid.
+        """
+        return json.dumps(dict((uid, self._get_result(uid)) for uid in uids))
 
     def run(self):
         """Run server which returns an available server port where code
@@ -153,12 +651,18 @@ class ServerPool(object):
         """
         # We start the code servers here to ensure they are run as nobody.
         self._start_code_servers()
+        PeriodicCallback(self._supervise, SUPERVISE_INTERVAL * 1000).start()
+        PeriodicCallback(
+            self._expire_results, RESULT_EXPIRE_INTERVAL * 1000
+        ).start()
+        if self.min_n != self.max_n:
+            PeriodicCallback(self._autoscale, SCALE_INTERVAL * 1000).start()
         IOLoop.current().start()
 
     def stop(self):
         """Stop all the code server processes.
         """
-        for proc in self.processes:
+        for proc in self.processes.values():
             proc.terminate()
         IOLoop.current().stop()
 
@@ -167,28 +671,184 @@ class MainHandler(RequestHandler):
     def initialize(self, server):
         self.server = server
 
+    @gen.coroutine
     def get(self):
         path = self.request.path[1:]
-        if len(path) == 0:
+        wait = get_wait(self.get_argument('wait', '0'))
+        uids = self.get_arguments('uid')
+        if len(path) == 0 and uids:
+            # Status of a batch of jobs.
+            if wait > 0:
+                yield [self.server.wait_for_result(uid, wait) for uid in uids]
+            self.write(self.server.get_results(uids))
+        elif path == 'metrics':
+            self.set_header('Content-Type', 'text/plain; version=0.0.4')
+            self.write(self.server.get_metrics())
+        elif len(path) == 0:
             q_size, alive, running = self.server.get_status()
             result = "%d processes, %d running, %d queued" % (
                 alive, running, q_size
             )
-            self.write(result)
+            lanes = ", ".join(
+                "%d %s" % (size, lane)
+                for lane, size in self.server.get_lane_sizes().items()
+            )
+            self.write("%s (%s), %d results unread" % (
+                result, lanes, self.server.get_unread_count()
+            ))
+            hits, misses, saved = self.server.get_dedup_stats()
+            if hits or misses:
+                self.write(
+                    "\n%d of %d submissions deduplicated (%.0f%%), "
+                    "%.1f seconds of evaluation saved" % (
+                        hits, hits + misses, 100.0*hits/(hits + misses),
+                        saved
+                    )
+                )
+            for when, before, after in self.server.scale_events:
+                self.write("\nScaled from %d to %d processes at %s" % (
+                    before, after,
+                    time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(when))
+                ))
         else:
             uid = path
+            if wait > 0:
+                yield self.server.wait_for_result(uid, wait)
             json_result = self.server.get_result(uid)
             self.write(json_result)
 
     def post(self):
-        uid = self.get_argument('uid')
-        json_data = self.get_argument('json_data')
-        user_dir = self.get_argument('user_dir')
-        self.server.submit(uid, json_data, user_dir)
+        lane = self.get_argument('lane', INTERACTIVE)
+        if lane not in LANES:
+            raise HTTPError(400, 'Unknown lane %s' % lane)
+        jobs = self.get_argument('jobs', None)
+        if jobs is not None:
+            # A batch of (uid, json_data, user_dir) jobs.
+            for uid, json_data, user_dir in json.loads(jobs):
+                self.server.submit(str(uid), json_data, user_dir, lane)
+        else:
+            uid = self.get_argument('uid')
+            json_data = self.get_argument('json_data')
+            user_dir = self.get_argument('user_dir')
+            self.server.submit(uid, json_data, user_dir, lane)
         self.write('OK')
 
 
-def submit(url, uid, json_data, user_dir):
+###############################################################################
+# `CodeServerClient` class.
+###############################################################################
+class CodeServerClient(object):
+    """Talks to a server pool over a single keep-alive HTTP session."""
+    def __init__(self, url, connect_timeout=POOL_CONNECT_TIMEOUT,
+                 read_timeout=POOL_READ_TIMEOUT, retries=POOL_CONNECT_RETRIES,
+                 backoff=POOL_RETRY_BACKOFF):
+        """Create a client for a server pool.
+
+        Parameters
+        ----------
+
+        url : str
+            URL of the server pool.
+
+        connect_timeout, read_timeout : float
+            Seconds to wait for the connection to the pool and for its
+            response.  Any time the pool is asked to wait for a result is
+            added to the read timeout.
+
+        retries : int
+            Number of times a refused connection is retried.
+
+        backoff : float
+            Backoff factor between retries, the n-th retry sleeps for
+            backoff * 2 ** (n - 1) seconds.
+        """
+        self.url = url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        # Only retry failures to connect, a request that reached the pool
+        # may already have been acted upon.
+        retry = Retry(total=retries, connect=retries, read=0, status=0,
+                      backoff_factor=backoff)
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(max_retries=retry))
+        self.session.mount('https://', HTTPAdapter(max_retries=retry))
+
+    def _timeout(self, wait=0):
+        return (self.connect_timeout, self.read_timeout + float(wait))
+
+    def submit(self, uid, json_data, user_dir, lane=INTERACTIVE):
+        """Submit a job to the code server, see `submit`."""
+        self.session.post(
+            self.url, data=dict(uid=uid, json_data=json_data,
+                                user_dir=user_dir, lane=lane),
+            timeout=self._timeout()
+        )
+
+    def _get_data(self, uid, wait):
+        params = dict(wait=wait) if wait else None
+        r = self.session.get(
+            urllib.parse.urljoin(self.url, str(uid)), params=params,
+            timeout=self._timeout(wait)
+        )
+        return json.loads(r.content.decode('utf-8'))
+
+    def get_result(self, uid, block=False, wait=0):
+        """Get the status of a job submitted to the code server, see
+        `get_result`.
+        """
+        data = self._get_data(uid, wait)
+        if block:
+            while data.get('status') != 'done':
+                if data.get('status') == 'unknown':
+                    # Nothing to wait on at the server, so back off here.
+                    time.sleep(0.1)
+                data = self._get_data(uid, RESULT_WAIT_TIMEOUT)
+        return data
+
+    def submit_batch(self, jobs, lane=INTERACTIVE):
+        """Submit several jobs in one request, see `submit_batch`."""
+        self.session.post(
+            self.url, data=dict(jobs=json.dumps(jobs), lane=lane),
+            timeout=self._timeout()
+        )
+
+    def _get_batch_data(self, uids, wait):
+        params = dict(uid=uids)
+        if wait:
+            params['wait'] = wait
+        r = self.session.get(self.url, params=params,
+                             timeout=self._timeout(wait))
+        return json.loads(r.content.decode('utf-8'))
+
+    def get_results(self, uids, block=False, wait=0):
+        """Get the status of several jobs, see `get_results`."""
+        data = self._get_batch_data([str(uid) for uid in uids], wait)
+        if block:
+            pending = [uid for uid, result in data.items()
+                       if result.get('status') != 'done']
+            while pending:
+                if any(data[uid].get('status') == 'unknown'
+                       for uid in pending):
+                    time.sleep(0.1)
+                data.update(self._get_batch_data(pending, RESULT_WAIT_TIMEOUT))
+                pending = [uid for uid in pending
+                           if data[uid].get('status') != 'done']
+        return data
+
+
+_clients = {}
+
+
+def get_client(url):
+    """Return the client shared by everything talking to the pool at `url`.
+    """
+    client = _clients.get(url)
+    if client is None:
+        client = _clients.setdefault(url, CodeServerClient(url))
+    return client
+
+
+def submit(url, uid, json_data, user_dir, lane=INTERACTIVE):
     '''Submit a job to the code server.
 
     Parameters
@@ -205,13 +865,15 @@ def submit(url, uid, json_data, user_dir):
 
     user_dir : str
         User directory.
+
+    lane : str
+        Lane to queue the job in, one of `LANES`.  Use `BACKGROUND` for work
+        nobody is waiting on, such as regrading.
     '''
-    requests.post(
-        url, data=dict(uid=uid, json_data=json_data, user_dir=user_dir)
-    )
+    get_client(url).submit(uid, json_data, user_dir, lane)
 
 
-def get_result(url, uid, block=False):
+def get_result(url, uid, block=False, wait=0):
     '''Get the status of a job submitted to the code server.
 
     Returns the result currently known in the form of a dict. The dictionary
@@ -231,17 +893,57 @@ def get_result(url, uid, block=False):
     block : bool
         Set to True if you wish to block till result is done.
 
+    wait : int
+        Number of seconds the server may hold the request open waiting for
+        the job to finish, before answering with the current status.  When
+        blocking the server is always asked to wait.
+
     '''
-    def _get_data():
-        r = requests.get(urllib.parse.urljoin(url, str(uid)))
-        return json.loads(r.content.decode('utf-8'))
-    data = _get_data()
-    if block:
-        while data.get('status') != 'done':
-            time.sleep(0.1)
-            data = _get_data()
+    return get_client(url).get_result(uid, block=block, wait=wait)
 
-    return data
+
+def submit_batch(url, jobs, lane=INTERACTIVE):
+    '''Submit several jobs to the code server in one request.
+
+    Parameters
+    ----------
+
+    url : str
+        URL of the server pool.
+
+    jobs : list
+        List of (uid, json_data, user_dir) tuples, as would be passed to
+        `submit`.
+
+    lane : str
+        Lane to queue the jobs in, one of `LANES`.
+    '''
+    get_client(url).submit_batch(jobs, lane)
+
+
+def get_results(url, uids, block=False, wait=0):
+    '''Get the status of several jobs submitted to the code server.
+
+    Returns a dict keyed by the uids, as strings, with the results as
+    returned by `get_result`.
+
+    Parameters
+    ----------
+
+    url : str
+        URL of the server pool.
+
+    uids : list
+        Unique IDs of the submissions.
+
+    block : bool
+        Set to True if you wish to block till all the results are done.
+
+    wait : int
+        Number of seconds the server may hold the request open waiting for
+        all the jobs to finish.
+    '''
+    return get_client(url).get_results(uids, block=block, wait=wait)
 
 
 ###############################################################################
@@ -255,13 +957,22 @@ def main(args=None):
         '-p', '--port', dest='port', default=SERVER_POOL_PORT,
         help="Port at which the http server should run."
     )
+    parser.add_argument(
+        '--min', dest='min_n', type=int, default=MIN_CODE_SERVERS,
+        help="Fewest servers to scale down to."
+    )
+    parser.add_argument(
+        '--max', dest='max_n', type=int, default=MAX_CODE_SERVERS,
+        help="Most servers to scale up to."
+    )
 
     options = parser.parse_args(args)
 
     # Called before serverpool is created so that the multiprocessing
     # can work properly.
     run_as_nobody()
-    server_pool = ServerPool(n=options.n, pool_port=options.port)
+    server_pool = ServerPool(n=options.n, pool_port=options.port,
+                             min_n=options.min_n, max_n=options.max_n)
 
     server_pool.run()
 
@@ -0,0 +1,216 @@
+"""Metrics kept by the code server pool, served at `/metrics` in the
+Prometheus text exposition format.
+
+These are counted in the tornado process of the pool as jobs move through
+it, so serving them never has to scan the results table.
+"""
+
+from __future__ import unicode_literals
+from collections import OrderedDict
+
+
+# Upper bounds, in seconds, of the evaluation duration histogram buckets.
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        '%s="%s"' % (name, str(value).replace('\\', r'\\').replace('"', r'\"'))
+        for name, value in zip(names, values)
+    )
+    return '{%s}' % pairs
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+###############################################################################
+# `Metric` class.
+###############################################################################
+class Metric(object):
+    """A counter or gauge, with one value for each combination of labels."""
+
+    def __init__(self, name, help, kind='counter', labels=()):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labels = tuple(labels)
+        self.values = OrderedDict()
+
+    def _key(self, labels):
+        return tuple(labels[name] for name in self.labels)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def set(self, value, **labels):
+        self.values[self._key(labels)] = value
+
+    def get(self, **labels):
+        return self.values.get(self._key(labels), 0)
+
+    def render(self):
+        lines = ['# HELP %s %s' % (self.name, self.help),
+                 '# TYPE %s %s' % (self.name, self.kind)]
+        for key, value in self.values.items():
+            lines.append('%s%s %s' % (
+                self.name, _format_labels(self.labels, key),
+                _format_value(value)
+            ))
+        return lines
+
+
+###############################################################################
+# `Histogram` class.
+###############################################################################
+class Histogram(Metric):
+    """Counts observations into cumulative buckets, for each combination of
+    labels.
+    """
+
+    def __init__(self, name, help, labels=(), buckets=DURATION_BUCKETS):
+        super(Histogram, self).__init__(name, help, 'histogram', labels)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        counts, total = self.values.get(key, ([0]*len(self.buckets), 0.0))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        self.values[key] = (counts, total + value)
+
+    def get(self, **labels):
+        """Returns the number of observations made."""
+        counts, total = self.values.get(self._key(labels), ([0], 0.0))
+        return counts[-1]
+
+    def render(self):
+        lines = ['# HELP %s %s' % (self.name, self.help),
+                 '# TYPE %s %s' % (self.name, self.kind)]
+        names = self.labels + ('le',)
+        for key, (counts, total) in self.values.items():
+            for bound, count in zip(self.buckets, counts):
+                lines.append('%s_bucket%s %d' % (
+                    self.name,
+                    _format_labels(names, key + (_format_value(bound),)),
+                    count
+                ))
+            labels = _format_labels(self.labels, key)
+            lines.append('%s_sum%s %r' % (self.name, labels, total))
+            lines.append('%s_count%s %d' % (self.name, labels, counts[-1]))
+        return lines
+
+
+###############################################################################
+# `PoolMetrics` class.
+###############################################################################
+class PoolMetrics(object):
+    """The metrics of one `ServerPool`."""
+
+    def __init__(self):
+        self.jobs_submitted = Metric(
+            'code_server_jobs_submitted_total',
+            'Jobs submitted to the pool.', labels=('lane',)
+        )
+        self.jobs_started = Metric(
+            'code_server_jobs_started_total',
+            'Jobs handed to a code server process.', labels=('lane',)
+        )
+        self.jobs_completed = Metric(
+            'code_server_jobs_completed_total',
+            'Jobs a code server process finished evaluating.'
+        )
+        self.timeouts = Metric(
+            'code_server_timeouts_total',
+            'Jobs whose code took longer than SERVER_TIMEOUT to run.',
+            labels=('language',)
+        )
+        self.restarts = Metric(
+            'code_server_process_restarts_total',
+            'Code server processes replaced after they exited or hung.',
+            labels=('reason',)
+        )
+        self.duration = Histogram(
+            'code_server_evaluation_seconds',
+            'Time taken to evaluate a job in a code server process.',
+            labels=('language', 'test_case_type')
+        )
+        self.phase_duration = Histogram(
+            'code_server_phase_seconds',
+            'Time taken by each phase of grading a job, and by each test '
+            'case for check_code, when GRADING_TIMINGS is set.',
+            labels=('language', 'phase')
+        )
+        self.dedup_hits = Metric(
+            'code_server_dedup_hits_total',
+            'Submissions given the result of an identical submission.'
+        )
+        self.dedup_misses = Metric(
+            'code_server_dedup_misses_total',
+            'Submissions evaluated as no identical one was found.'
+        )
+        self.dedup_saved = Metric(
+            'code_server_dedup_saved_seconds_total',
+            'Seconds of evaluation saved by deduplicating submissions.'
+        )
+
+    def observe_job(self, stats):
+        """Record the `stats` a code server process sent back with a
+        result.
+        """
+        self.jobs_completed.inc()
+        self.duration.observe(
+            stats['duration'], language=stats['language'],
+            test_case_type=stats['test_case_type']
+        )
+        if stats['timed_out']:
+            self.timeouts.inc(language=stats['language'])
+        for phase, seconds in (stats.get('timings') or {}).items():
+            cases = seconds if isinstance(seconds, list) else [seconds]
+            for case_seconds in cases:
+                self.phase_duration.observe(
+                    case_seconds, language=stats['language'], phase=phase
+                )
+
+    def render(self, pool):
+        """Returns the metrics of `pool` in the Prometheus text format."""
+        queued = Metric(
+            'code_server_queued_jobs', 'Jobs waiting for a code server '
+            'process.', 'gauge', labels=('lane',)
+        )
+        for lane, size in pool.get_lane_sizes().items():
+            queued.set(size, lane=lane)
+        q_size, alive, running = pool.get_status()
+        gauges = [
+            ('code_server_processes', 'Code server processes alive.', alive),
+            ('code_server_running_jobs', 'Jobs being evaluated.', running),
+            ('code_server_stored_results',
+             'Entries in the results table of the pool.', len(pool.results)),
+            ('code_server_unread_results',
+             'Finished results waiting to be read.',
+             pool.get_unread_count()),
+            ('code_server_dedup_entries',
+             'Results kept to deduplicate submissions.', len(pool.dedup)),
+        ]
+        metrics = [queued]
+        for name, help, value in gauges:
+            gauge = Metric(name, help, 'gauge')
+            gauge.set(value)
+            metrics.append(gauge)
+        metrics.extend([
+            self.jobs_submitted, self.jobs_started, self.jobs_completed,
+            self.timeouts, self.restarts, self.duration,
+            self.phase_duration, self.dedup_hits, self.dedup_misses,
+            self.dedup_saved
+        ])
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
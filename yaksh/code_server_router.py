@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+
+"""A router spreading code submissions over several server pools, possibly
+on different machines.
+
+The router speaks the same HTTP protocol as a single `ServerPool`, so the
+web application only needs to be pointed at it.  Each submission goes to the
+node with the fewest jobs outstanding, and the router remembers which node
+owns each uid so that results are asked for at the right pool.  A node can
+be drained, it then gets no new jobs while the results of the ones it owns
+are still collected.
+
+To try it out locally start a few pools and a router in front of them::
+
+    $ python -m yaksh.code_server -p 55601 2
+    $ python -m yaksh.code_server -p 55602 2
+    $ python -m yaksh.code_server_router http://localhost:55601 \\
+        http://localhost:55602
+
+"""
+
+# Standard library imports
+from __future__ import unicode_literals
+from argparse import ArgumentParser
+from collections import OrderedDict
+import json
+import sys
+import time
+
+# Library imports
+from tornado import gen
+from tornado import httpclient
+from tornado.httpclient import AsyncHTTPClient, HTTPRequest, HTTPResponse
+from tornado.ioloop import IOLoop, PeriodicCallback
+from tornado.web import Application, RequestHandler, HTTPError
+import urllib
+
+# Local imports
+from .settings import (
+    SERVER_POOL_PORT, POOL_CONNECT_TIMEOUT, POOL_READ_TIMEOUT, RESULT_TTL,
+    CODE_SERVER_NODES, NODE_CHECK_INTERVAL
+)
+from .code_server import INTERACTIVE, LANES, get_wait
+
+
+###############################################################################
+# `PoolRouter` class.
+###############################################################################
+class PoolRouter(object):
+    """Routes jobs to several server pools."""
+    def __init__(self, nodes, port=SERVER_POOL_PORT):
+        """Create a router.
+
+        Parameters
+        ----------
+
+        nodes : list
+            URLs of the server pools to route to.
+
+        port : int
+            Port at which the router should serve.
+        """
+        # Jobs each node owns that have not been read as done yet.
+        self.outstanding = OrderedDict((node, 0) for node in nodes)
+        self.draining = set()
+        self.down = set()
+        # The node owning each uid and when it was submitted, oldest first.
+        self.owners = OrderedDict()
+        self.my_port = port
+        self.http_client = AsyncHTTPClient()
+        self.app = self._make_app()
+
+    # Private Protocol ##########
+
+    def _make_app(self):
+        app = Application([
+            (r"/.*", RouterHandler, dict(router=self)),
+        ])
+        app.listen(self.my_port)
+        return app
+
+    def _choose_node(self):
+        """Returns the node with the fewest jobs outstanding that is up and
+        not draining.
+        """
+        nodes = [node for node in self.outstanding
+                 if node not in self.draining and node not in self.down]
+        if not nodes:
+            raise HTTPError(503, 'No code server node is available')
+        return min(nodes, key=lambda node: self.outstanding[node])
+
+    def _assign(self, uid):
+        self._forget(uid)
+        node = self._choose_node()
+        self.owners[uid] = (node, time.time())
+        self.outstanding[node] += 1
+        return node
+
+    def _forget(self, uid):
+        owner = self.owners.pop(uid, None)
+        if owner is not None:
+            self.outstanding[owner[0]] -= 1
+
+    def _expire_owners(self):
+        """Forget the uids whose results the pools will have dropped."""
+        expire_before = time.time() - RESULT_TTL
+        while self.owners:
+            uid, (node, submitted) = next(iter(self.owners.items()))
+            if submitted > expire_before:
+                break
+            self._forget(uid)
+
+    @gen.coroutine
+    def _fetch(self, node, path='', wait=0, **kw):
+        request = HTTPRequest(
+            urllib.parse.urljoin(node, path),
+            connect_timeout=POOL_CONNECT_TIMEOUT,
+            request_timeout=POOL_READ_TIMEOUT + wait, **kw
+        )
+        try:
+            response = yield self.http_client.fetch(request,
+                                                    raise_error=False)
+        except (OSError, httpclient.HTTPError) as error:
+            # Newer tornado raises these instead of returning a 599.
+            response = HTTPResponse(request, 599, error=error)
+        if response.code == 599:
+            # Could not connect or timed out.
+            self.down.add(node)
+        return response
+
+    @gen.coroutine
+    def _check_nodes(self):
+        """Find out which nodes are up."""
+        nodes = list(self.outstanding)
+        responses = yield [
+            self._fetch(node, method='GET') for node in nodes
+        ]
+        for node, response in zip(nodes, responses):
+            if response.code == 200:
+                self.down.discard(node)
+        self._expire_owners()
+
+    @gen.coroutine
+    def _post(self, node, data):
+        """Post `data` to `node` and return the response code.  The node is
+        taken to be down when it cannot be reached or fails, not when it
+        rejects the data.
+        """
+        response = yield self._fetch(
+            node, method='POST', body=urllib.parse.urlencode(data),
+            headers={'Content-Type': 'application/x-www-form-urlencoded'}
+        )
+        if response.code >= 500:
+            self.down.add(node)
+        return response.code
+
+    @gen.coroutine
+    def _get_node_results(self, node, uids, wait):
+        query = [('uid', uid) for uid in uids]
+        if wait:
+            query.append(('wait', wait))
+        response = yield self._fetch(
+            node, '?' + urllib.parse.urlencode(query), wait, method='GET'
+        )
+        if response.code != 200:
+            # The node may only be briefly unreachable, the jobs are still
+            # its own.
+            return dict((uid, dict(status='running')) for uid in uids)
+        return json.loads(response.body.decode('utf-8'))
+
+    # Public Protocol ##########
+
+    def drain(self, node):
+        """Stop sending new jobs to `node`."""
+        if node not in self.outstanding:
+            raise HTTPError(400, 'Unknown node %s' % node)
+        self.draining.add(node)
+
+    def resume(self, node):
+        """Send new jobs to a drained `node` again."""
+        if node not in self.outstanding:
+            raise HTTPError(400, 'Unknown node %s' % node)
+        self.draining.discard(node)
+
+    def get_status(self):
+        """Returns the status of each node as a list of
+        (node, outstanding, state) tuples.
+        """
+        status = []
+        for node, outstanding in self.outstanding.items():
+            if node in self.down:
+                state = 'down'
+            elif node in self.draining:
+                state = 'drained' if outstanding == 0 else 'draining'
+            else:
+                state = 'up'
+            status.append((node, outstanding, state))
+        return status
+
+    @gen.coroutine
+    def submit(self, jobs, lane=INTERACTIVE):
+        """Send (uid, json_data, user_dir) `jobs` to the least loaded nodes.
+        """
+        batches = OrderedDict()
+        for uid, json_data, user_dir in jobs:
+            node = self._assign(str(uid))
+            batches.setdefault(node, []).append((uid, json_data, user_dir))
+        codes = yield [
+            self._post(node, dict(jobs=json.dumps(batch), lane=lane))
+            for node, batch in batches.items()
+        ]
+        failed = [batch for code, batch in zip(codes, batches.values())
+                  if code >= 500]
+        if failed:
+            # Send them elsewhere, the nodes that failed are now down.
+            yield self.submit(sum(failed, []), lane)
+        rejected = [(code, batch) for code, batch in
+                    zip(codes, batches.values()) if 200 < code < 500]
+        for code, batch in rejected:
+            for uid, json_data, user_dir in batch:
+                self._forget(str(uid))
+        if rejected:
+            # A bad submission, it would be rejected by any node.
+            raise HTTPError(rejected[0][0],
+                            'Jobs rejected by the code server node')
+
+    @gen.coroutine
+    def get_results(self, uids, wait=0):
+        """Returns the results of `uids` as a dict, asking each owning node
+        for the results of its jobs at once.
+        """
+        results = {}
+        by_node = OrderedDict()
+        for uid in uids:
+            owner = self.owners.get(uid)
+            if owner is None:
+                results[uid] = dict(status='unknown')
+            else:
+                by_node.setdefault(owner[0], []).append(uid)
+        node_results = yield [
+            self._get_node_results(node, node_uids, wait)
+            for node, node_uids in by_node.items()
+        ]
+        for data in node_results:
+            results.update(data)
+        for uid, result in results.items():
+            if result.get('status') in ('done', 'unknown'):
+                self._forget(uid)
+        return results
+
+    def run(self):
+        """Run the router."""
+        PeriodicCallback(self._check_nodes, NODE_CHECK_INTERVAL * 1000).start()
+        IOLoop.current().start()
+
+    def stop(self):
+        IOLoop.current().stop()
+
+
+class RouterHandler(RequestHandler):
+    def initialize(self, router):
+        self.router = router
+
+    @gen.coroutine
+    def get(self):
+        path = self.request.path[1:]
+        wait = get_wait(self.get_argument('wait', '0'))
+        uids = self.get_arguments('uid')
+        if len(path) == 0 and uids:
+            results = yield self.router.get_results(uids, wait)
+            self.write(json.dumps(results))
+        elif len(path) == 0:
+            for node, outstanding, state in self.router.get_status():
+                self.write("%s: %s, %d outstanding\n" % (
+                    node, state, outstanding
+                ))
+        else:
+            results = yield self.router.get_results([path], wait)
+            self.write(json.dumps(results[path]))
+
+    @gen.coroutine
+    def post(self):
+        path = self.request.path[1:]
+        if path in ('drain', 'resume'):
+            getattr(self.router, path)(self.get_argument('node'))
+            self.write('OK')
+            return
+        lane = self.get_argument('lane', INTERACTIVE)
+        if lane not in LANES:
+            raise HTTPError(400, 'Unknown lane %s' % lane)
+        jobs = self.get_argument('jobs', None)
+        if jobs is not None:
+            jobs = json.loads(jobs)
+        else:
+            jobs = [(self.get_argument('uid'), self.get_argument('json_data'),
+                     self.get_argument('user_dir'))]
+        yield self.router.submit(jobs, lane)
+        self.write('OK')
+
+
+def main(args=None):
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        'nodes', nargs='*', default=CODE_SERVER_NODES,
+        help="URLs of the server pools to route to."
+    )
+    parser.add_argument(
+        '-p', '--port', dest='port', type=int, default=SERVER_POOL_PORT,
+        help="Port at which the router should run."
+    )
+    options = parser.parse_args(args)
+    router = PoolRouter(options.nodes, port=options.port)
+    router.run()
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(args)
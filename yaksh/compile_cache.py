@@ -0,0 +1,141 @@
+"""A cache of compiled test case code shared by all the code server
+processes.
+
+The code an instructor writes to test an answer is the same for every
+student, so it only needs compiling once.  Compiled files are stored under
+the hash of the source, the compiler and its flags, and of the files of the
+question, which the source may include.  The least recently used ones are
+removed once the cache grows beyond its size limit.
+"""
+
+from __future__ import unicode_literals
+import hashlib
+import os
+
+# Local imports
+from .settings import COMPILE_CACHE_DIR, COMPILE_CACHE_SIZE
+
+
+class CompileCache(object):
+    """Compiled files kept in `directory`, at most `max_size` bytes of them.
+    """
+    def __init__(self, directory=COMPILE_CACHE_DIR,
+                 max_size=COMPILE_CACHE_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+
+    # Private Protocol ##########
+    def _get_size(self, path):
+        return os.stat(path).st_size
+
+    def _remove(self, path):
+        os.remove(path)
+
+    # Public Protocol ##########
+    def get_path(self, source, command, suffix='', files=()):
+        """Returns where the output of compiling `source` with `command`,
+        alongside the files at the paths `files`, is kept.
+        """
+        digest = hashlib.sha256()
+        digest.update(command.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(source.encode('utf-8'))
+        for file_path in sorted(files):
+            if not os.path.isfile(file_path):
+                continue
+            digest.update(b'\0' + file_path.encode('utf-8') + b'\0')
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+        return os.path.join(self.directory, digest.hexdigest() + suffix)
+
+    def compile(self, source, command, source_path, run, suffix='',
+                files=()):
+        """Compile `source`, written to `source_path`, unless it is cached.
+
+        Parameters
+        ----------
+
+        source : str
+            The code to compile.
+
+        command : str
+            The compile command, with `{0}` and `{1}` standing for the source
+            and the output file.
+
+        source_path : str
+            The file `source` has been written to.
+
+        run : callable
+            Runs the command given to it like `BaseEvaluator._run_command`,
+            returning the process, its stdout and its stderr.
+
+        suffix : str
+            Extension of the compiled file.
+
+        files : list
+            Paths of the files, such as headers, the source is compiled
+            with.
+
+        Returns
+        -------
+
+        A tuple (path, result) with the path of the compiled file and the
+        result of `run`, which is None when the cached file was used.  Code
+        that does not compile cleanly is not cached.  Both are None when the
+        cache cannot be written to, the source must then be compiled without
+        it.
+        """
+        path = self.get_path(source, command, suffix, files)
+        if os.path.exists(path):
+            # Mark it as recently used.
+            os.utime(path, None)
+            return path, None
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory, exist_ok=True)
+            if not os.access(self.directory, os.W_OK):
+                return None, None
+            result = run(command.format(source_path, tmp_path))
+            proc, stdout, stderr = result
+            if proc.returncode == 0 and not stderr and \
+                    os.path.exists(tmp_path):
+                os.rename(tmp_path, path)
+                self.evict()
+        except OSError:
+            return None, None
+        finally:
+            if os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+        return path, result
+
+    def evict(self):
+        """Remove the least recently used files beyond the size limit."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.tmp'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                entries.append(
+                    (os.stat(path).st_mtime, self._get_size(path), name)
+                )
+            except OSError:
+                # Removed by another process.
+                continue
+        size = sum(entry[1] for entry in entries)
+        for mtime, entry_size, name in sorted(entries):
+            if size <= self.max_size:
+                break
+            try:
+                self._remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            size -= entry_size
+
+
+harness_cache = CompileCache()
@@ -8,6 +8,7 @@ import subprocess
 from .file_utils import copy_files, delete_files
 from .base_evaluator import BaseEvaluator
 from .grader import CompilationError, TestCaseError
+from .compile_cache import harness_cache
 from .error_messages import prettify_exceptions
 
 
@@ -61,6 +62,37 @@ class CppCodeEvaluator(BaseEvaluator):
             )
         return compile_command, compile_main
 
+    def compile_test_code(self, clean_ref_code_path):
+        """Compile the test case code and link it with the user's answer.
+        When COMPILE_CACHE_DIR is set the compiled test case code is cached,
+        so that it is compiled only for the first submission tested with it.
+        """
+        main_object_path = None
+        if harness_cache.directory:
+            main_object_path, result = harness_cache.compile(
+                self.test_case, 'g++ {0} -c -o {1}', clean_ref_code_path,
+                lambda command: self._run_command(
+                    command, shell=True, stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE
+                ),
+                suffix='.o', files=self.files
+            )
+        if main_object_path is None:
+            return self._run_command(
+                self.compile_main, shell=True, stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE
+            )
+        if result is not None and not os.path.exists(main_object_path):
+            # The test case code does not compile.
+            return result
+        link_command = 'g++ {0} {1} -o {2}'.format(
+            main_object_path, self.user_output_path, self.ref_output_path
+        )
+        return self._run_command(
+            link_command, shell=True, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+
     def compile_code(self):
         if self.compiled_user_answer and self.compiled_test_code:
             return None
@@ -86,18 +118,15 @@ class CppCodeEvaluator(BaseEvaluator):
                 self.user_output_path,
                 self.ref_output_path
             )
-            self.compiled_user_answer = self._run_command(
+            self.compiled_user_answer = self._run_command_once(
                 self.compile_command,
                 shell=True,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE
             )
 
-            self.compiled_test_code = self._run_command(
-                self.compile_main,
-                shell=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
+            self.compiled_test_code = self.compile_test_code(
+                clean_ref_code_path
             )
 
             return self.compiled_user_answer, self.compiled_test_code
@@ -61,18 +61,14 @@ class CppStdIOEvaluator(StdIOEvaluator):
             self.user_output_path,
             self.ref_output_path
             )
-        self.compiled_user_answer = self._run_command(self.compile_command,
-                                                      shell=True,
-                                                      stdin=subprocess.PIPE,
-                                                      stdout=subprocess.PIPE,
-                                                      stderr=subprocess.PIPE
-                                                      )
-        self.compiled_test_code = self._run_command(self.compile_main,
-                                                    shell=True,
-                                                    stdin=subprocess.PIPE,
-                                                    stdout=subprocess.PIPE,
-                                                    stderr=subprocess.PIPE
-                                                    )
+        self.compiled_user_answer = self._run_command_once(
+            self.compile_command, shell=True, stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        self.compiled_test_code = self._run_command_once(
+            self.compile_main, shell=True, stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
         return self.compiled_user_answer, self.compiled_test_code
 
     def check_code(self):
@@ -84,13 +80,12 @@ class CppStdIOEvaluator(StdIOEvaluator):
         if stdnt_stderr == '':
             proc, main_out, main_err = self.compiled_test_code
             main_err = self._remove_null_substitute_char(main_err)
-            proc = subprocess.Popen("./executable",
-                                    shell=True,
-                                    stdin=subprocess.PIPE,
-                                    stdout=subprocess.PIPE,
-                                    stderr=subprocess.PIPE,
-                                    preexec_fn=os.setpgrp
-                                    )
+            proc = self._popen("./executable",
+                               shell=True,
+                               stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE
+                               )
             success, err = self.evaluate_stdio(self.user_answer, proc,
                                                self.expected_input,
                                                self.expected_output
@@ -3,9 +3,12 @@ import unittest
 import os
 import shutil
 import tempfile
+import time
 from psutil import Process
 # Local Imports
+from yaksh import bash_code_evaluator
 from yaksh.grader import Grader
+from yaksh.base_evaluator import BaseEvaluator
 from yaksh.evaluator_tests.test_python_evaluation import EvaluatorBaseTest
 from yaksh.settings import SERVER_TIMEOUT
 from textwrap import dedent
@@ -161,6 +164,34 @@ class BashAssertionEvaluationTestCases(EvaluatorBaseTest):
             children_procs = Process(parent_proc[0].pid)
             self.assertFalse(any(children_procs.children(recursive=True)))
 
+    def test_args_run_by_one_bash_process(self):
+        # Given
+        # $$ is the pid of the bash process running the script.
+        self.test_case_data[0]['test_case'] = "echo $$ $# $2"
+        user_answer = "echo $$ $# $2"
+        kwargs = {'metadata': {
+                  'user_answer': user_answer,
+                  'file_paths': self.file_paths,
+                  'partial_grading': False,
+                  'language': 'bash'
+                  }, 'test_case_data': self.test_case_data,
+                  }
+
+        bash_batch = bash_code_evaluator.BASH_BATCH
+
+        # When
+        bash_code_evaluator.BASH_BATCH = False
+        try:
+            unbatched = Grader(self.in_dir).evaluate(kwargs)
+            bash_code_evaluator.BASH_BATCH = True
+            batched = Grader(self.in_dir).evaluate(kwargs)
+        finally:
+            bash_code_evaluator.BASH_BATCH = bash_batch
+
+        # Then
+        self.assertTrue(batched.get("success"))
+        self.assertFalse(unbatched.get("success"))
+
     def test_file_based_assert(self):
         # Given
         self.file_paths = [(self.f_path, False)]
@@ -324,6 +355,109 @@ class BashStdIOEvaluationTestCases(EvaluatorBaseTest):
         # Then
         self.assertTrue(result.get('success'))
 
+    def test_printing_infinite_loop(self):
+        # Given
+        user_answer = dedent(""" #!/bin/bash
+                             while true; do echo 3; done
+                             """
+                             )
+        test_case_data = [{
+            'expected_output': '3\n3',
+            'expected_input': '',
+            'test_case_type': 'stdiobasedtestcase',
+            'weight': 0.0
+            }]
+        kwargs = {
+                  'metadata': {
+                    'user_answer': user_answer,
+                    'file_paths': self.file_paths,
+                    'partial_grading': False,
+                    'language': 'bash'
+                    }, 'test_case_data': test_case_data,
+                  }
+
+        # When
+        start = time.time()
+        grader = Grader(self.in_dir)
+        result = grader.evaluate(kwargs)
+
+        # Then
+        self.assertFalse(result.get('success'))
+        self.assertLess(time.time() - start, SERVER_TIMEOUT)
+        error = result.get("error")[0]
+        self.assertIn("printed more output than expected", error["error_msg"])
+        self.assertEqual(error["user_output"][:2], ["3", "3"])
+
+    def test_wrong_line_stops_answer(self):
+        # Given
+        user_answer = dedent(""" #!/bin/bash
+                             echo 4
+                             echo 2
+                             sleep 100
+                             """
+                             )
+        test_case_data = [{
+            'expected_output': '3\n2\n1',
+            'expected_input': '',
+            'test_case_type': 'stdiobasedtestcase',
+            'weight': 0.0
+            }]
+        kwargs = {
+                  'metadata': {
+                    'user_answer': user_answer,
+                    'file_paths': self.file_paths,
+                    'partial_grading': False,
+                    'language': 'bash'
+                    }, 'test_case_data': test_case_data,
+                  }
+
+        # When
+        start = time.time()
+        grader = Grader(self.in_dir)
+        result = grader.evaluate(kwargs)
+
+        # Then
+        self.assertFalse(result.get('success'))
+        self.assertLess(time.time() - start, SERVER_TIMEOUT)
+        error = result.get("error")[0]
+        self.assertIn("line number 1 did not match", error["error_msg"])
+        self.assertEqual(error["error_line_numbers"], [0])
+        self.assertEqual(error["user_output"][0], "4")
+
+    def test_output_limit(self):
+        # Given
+        user_answer = dedent(""" #!/bin/bash
+                             printf 'a%.0s' {1..100}
+                             """
+                             )
+        test_case_data = [{
+            'expected_output': 'a' * 100,
+            'expected_input': '',
+            'test_case_type': 'stdiobasedtestcase',
+            'weight': 0.0
+            }]
+        kwargs = {
+                  'metadata': {
+                    'user_answer': user_answer,
+                    'file_paths': self.file_paths,
+                    'partial_grading': False,
+                    'language': 'bash'
+                    }, 'test_case_data': test_case_data,
+                  }
+
+        # When
+        output_limit = BaseEvaluator.output_limit
+        BaseEvaluator.output_limit = 10
+        try:
+            grader = Grader(self.in_dir)
+            result = grader.evaluate(kwargs)
+        finally:
+            BaseEvaluator.output_limit = output_limit
+
+        # Then
+        self.assertFalse(result.get('success'))
+        self.assertEqual(result.get("error")[0]["user_output"], ["a" * 10])
+
 
 class BashHookEvaluationTestCases(EvaluatorBaseTest):
 
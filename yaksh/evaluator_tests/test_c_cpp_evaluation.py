@@ -8,6 +8,7 @@ from psutil import Process
 
 # Local import
 from yaksh.grader import Grader
+from yaksh.compile_cache import CompileCache, harness_cache
 from yaksh.evaluator_tests.test_python_evaluation import EvaluatorBaseTest
 from yaksh.settings import SERVER_TIMEOUT
 
@@ -85,6 +86,98 @@ class CAssertionEvaluationTestCases(EvaluatorBaseTest):
         # Then
         self.assertTrue(result.get('success'))
 
+    def test_answer_is_compiled_once(self):
+        # Given
+        user_answer = "int add(int a, int b)\n{return a+b;}"
+        test_case = dict(self.test_case_data[0], weight=1.0)
+        kwargs = {
+                  'metadata': {
+                    'user_answer': user_answer,
+                    'file_paths': self.file_paths,
+                    'partial_grading': True,
+                    'language': 'cpp'
+                    }, 'test_case_data': [test_case, dict(test_case)],
+                  }
+
+        # When
+        grader = Grader(self.in_dir)
+        cwd = os.getcwd()
+        os.chdir(self.in_dir)
+        try:
+            first, second = grader.get_evaluator_objects(kwargs)
+            first.compile_code()
+            second.compile_code()
+        finally:
+            os.chdir(cwd)
+        result = grader.evaluate(kwargs)
+
+        # Then
+        self.assertIs(first.compiled_user_answer, second.compiled_user_answer)
+        self.assertIsNot(first.compiled_test_code, second.compiled_test_code)
+        self.assertTrue(result.get('success'))
+        self.assertEqual(result.get('weight'), 2.0)
+
+    def test_test_case_is_compiled_once(self):
+        # Given
+        user_answer = "int add(int a, int b)\n{return a+b;}"
+        kwargs = {
+                  'metadata': {
+                    'user_answer': user_answer,
+                    'file_paths': self.file_paths,
+                    'partial_grading': False,
+                    'language': 'cpp'
+                    }, 'test_case_data': self.test_case_data,
+                  }
+        cache_dir = harness_cache.directory
+        harness_cache.directory = tempfile.mkdtemp()
+        main_object_path = harness_cache.get_path(
+            self.tc_data, 'g++ {0} -c -o {1}', '.o'
+        )
+
+        # When
+        try:
+            result = Grader(self.in_dir).evaluate(kwargs)
+            compiled_at = os.stat(main_object_path).st_ino
+            kwargs['metadata']['user_answer'] = user_answer.replace(
+                'a+b', 'b+a'
+            )
+            second_result = Grader(self.in_dir).evaluate(kwargs)
+            recompiled_at = os.stat(main_object_path).st_ino
+        finally:
+            shutil.rmtree(harness_cache.directory)
+            harness_cache.directory = cache_dir
+
+        # Then
+        self.assertTrue(result.get('success'))
+        self.assertTrue(second_result.get('success'))
+        self.assertEqual(recompiled_at, compiled_at)
+
+    def test_cache_that_cannot_be_written_to_is_skipped(self):
+        # Given
+        user_answer = "int add(int a, int b)\n{return a+b;}"
+        kwargs = {
+                  'metadata': {
+                    'user_answer': user_answer,
+                    'file_paths': self.file_paths,
+                    'partial_grading': False,
+                    'language': 'cpp'
+                    }, 'test_case_data': self.test_case_data,
+                  }
+        not_a_directory = os.path.join(self.in_dir, 'cache')
+        with open(not_a_directory, 'w') as f:
+            f.write('')
+        cache_dir = harness_cache.directory
+        harness_cache.directory = os.path.join(not_a_directory, 'cache')
+
+        # When
+        try:
+            result = Grader(self.in_dir).evaluate(kwargs)
+        finally:
+            harness_cache.directory = cache_dir
+
+        # Then
+        self.assertTrue(result.get('success'))
+
     def test_incorrect_answer(self):
         # Given
         user_answer = "int add(int a, int b)\n{return a-b;}"
@@ -281,6 +374,60 @@ class CAssertionEvaluationTestCases(EvaluatorBaseTest):
             self.assertEqual(error['exception'], 'TestCaseError')
 
 
+class CompileCacheTestCases(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = CompileCache(self.directory, max_size=20)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_least_recently_used_files_are_evicted(self):
+        # Given
+        for age, name in enumerate(['new', 'old', 'older']):
+            path = os.path.join(self.directory, name)
+            with open(path, 'w') as f:
+                f.write('0123456789')
+            os.utime(path, (1000 - age, 1000 - age))
+
+        # When
+        self.cache.evict()
+
+        # Then
+        self.assertEqual(sorted(os.listdir(self.directory)), ['new', 'old'])
+
+    def test_cache_that_cannot_be_written_to_is_not_used(self):
+        # Given
+        not_a_directory = os.path.join(self.directory, 'file')
+        with open(not_a_directory, 'w') as f:
+            f.write('')
+        cache = CompileCache(os.path.join(not_a_directory, 'cache'))
+
+        # When
+        path, result = cache.compile('main', 'g++ {0} -c -o {1}', 'main.c',
+                                     lambda command: self.fail(command))
+
+        # Then
+        self.assertIsNone(path)
+        self.assertIsNone(result)
+
+    def test_files_of_the_question_are_part_of_the_key(self):
+        # Given
+        header_path = os.path.join(self.directory, 'values.h')
+        with open(header_path, 'w') as f:
+            f.write('#define VALUE 1\n')
+        path = self.cache.get_path('main', 'g++', '.o', [header_path])
+
+        # When
+        with open(header_path, 'w') as f:
+            f.write('#define VALUE 2\n')
+        changed_path = self.cache.get_path('main', 'g++', '.o', [header_path])
+
+        # Then
+        self.assertNotEqual(changed_path, path)
+        self.assertNotEqual(self.cache.get_path('main', 'g++', '.o'), path)
+
+
 class CppStdIOEvaluationTestCases(EvaluatorBaseTest):
     def setUp(self):
         self.test_case_data = [{'expected_output': '11',
@@ -293,6 +440,8 @@ class CppStdIOEvaluationTestCases(EvaluatorBaseTest):
         self.timeout_msg = ("Code took more than {0} seconds to run. "
                             "You probably have an infinite loop in"
                             " your code.").format(SERVER_TIMEOUT)
+        self.output_cut_msg = ("Your code was stopped as it printed more "
+                               "output than expected.")
         self.file_paths = None
 
     def tearDown(self):
@@ -447,7 +596,7 @@ class CppStdIOEvaluationTestCases(EvaluatorBaseTest):
         #include<stdio.h>
         int main(void){
         while(0==0){
-        printf("abc");}
+        }
         }""")
         kwargs = {
                   'metadata': {
@@ -673,8 +822,8 @@ class CppStdIOEvaluationTestCases(EvaluatorBaseTest):
 
         # Then
         self.assertFalse(result.get("success"))
-        self.assert_correct_output(self.timeout_msg,
-                                   result.get("error")[0]["message"]
+        self.assert_correct_output(self.output_cut_msg,
+                                   result.get("error")[0]["error_msg"]
                                    )
 
     def test_cpp_only_stdout(self):
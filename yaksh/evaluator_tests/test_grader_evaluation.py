@@ -1,8 +1,17 @@
 from __future__ import unicode_literals
 import unittest
+import os
+import shutil
+import tempfile
+import time
+from textwrap import dedent
+from psutil import Process
+
+from yaksh import grader as grader_module
 from yaksh import python_assertion_evaluator
+from yaksh.grader import Grader
 from yaksh.language_registry import _LanguageRegistry, get_registry
-from yaksh.settings import code_evaluators
+from yaksh.settings import code_evaluators, SERVER_TIMEOUT
 
 
 class RegistryTestCase(unittest.TestCase):
@@ -34,9 +43,300 @@ class RegistryTestCase(unittest.TestCase):
         )
         self.assertEqual(evaluator_class, class_name)
 
+    def test_classes_are_loaded_once(self):
+        # When
+        self.language_registry.preload()
+
+        # Then
+        self.assertIn(
+            "yaksh.python_assertion_evaluator.PythonAssertionEvaluator",
+            self.language_registry._classes
+        )
+        self.assertIs(
+            self.language_registry.get_class("python", "standardtestcase"),
+            self.language_registry._classes[
+                "yaksh.python_assertion_evaluator.PythonAssertionEvaluator"
+            ]
+        )
+        self.assertIs(
+            self.language_registry.get_class("c", "standardtestcase"),
+            self.language_registry.get_class("cpp", "standardtestcase")
+        )
+
+    def test_preload_skips_classes_that_cannot_be_loaded(self):
+        # Given
+        self.language_registry.register(
+            "broken", {"standardtestcase": "yaksh.no_such_module.Evaluator",
+                       "stdiobasedtestcase": "yaksh.grader.NoSuchEvaluator"}
+        )
+
+        # When
+        with self.assertLogs('yaksh.language_registry', 'ERROR') as logs:
+            self.language_registry.preload()
+
+        # Then
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn(
+            "yaksh.python_assertion_evaluator.PythonAssertionEvaluator",
+            self.language_registry._classes
+        )
+
     def tearDown(self):
         self.registry_object = None
 
 
+class GraderTestCases(unittest.TestCase):
+    def setUp(self):
+        self.in_dir = tempfile.mkdtemp()
+        self.file_paths = None
+
+    def tearDown(self):
+        shutil.rmtree(self.in_dir, ignore_errors=True)
+
+    def _get_limits(self, language):
+        kwargs = {'metadata': {'user_answer': '', 'language': language},
+                  'test_case_data': [{'test_case_type': 'standardtestcase'}]}
+        evaluator = Grader().get_evaluator_objects(kwargs)[0]
+        return evaluator.resource_limits
+
+    def test_resource_limits_of_languages(self):
+        # When
+        python_limits = self._get_limits('python')
+        java_limits = self._get_limits('java')
+
+        # Then
+        self.assertIsNotNone(python_limits['cpu'])
+        self.assertIsNone(python_limits['processes'])
+        self.assertIsNone(java_limits['cpu'])
+        self.assertIsNone(java_limits['memory'])
+        self.assertEqual(java_limits['files'], python_limits['files'])
+
+    def test_test_cases_checked_in_parallel(self):
+        # Given
+        user_answer = dedent(""" #!/bin/bash
+                             read A
+                             sleep 1
+                             echo -n `expr $A + 1`
+                             """
+                             )
+        test_case_data = [{'expected_output': str(i + 1),
+                           'expected_input': str(i),
+                           'test_case_type': 'stdiobasedtestcase',
+                           'weight': 1.0
+                           } for i in range(4)]
+        test_case_data[3]['expected_output'] = '5'
+        kwargs = {
+                  'metadata': {
+                    'user_answer': user_answer,
+                    'file_paths': self.file_paths,
+                    'partial_grading': True,
+                    'language': 'bash'
+                    }, 'test_case_data': test_case_data,
+                  }
+        parallel_test_cases = grader_module.PARALLEL_TEST_CASES
+        grader_module.PARALLEL_TEST_CASES = 4
+
+        # When
+        start = time.time()
+        try:
+            grader = Grader(self.in_dir)
+            result = grader.evaluate(kwargs)
+        finally:
+            grader_module.PARALLEL_TEST_CASES = parallel_test_cases
+        elapsed = time.time() - start
+
+        # Then
+        self.assertLess(elapsed, 3)
+        self.assertFalse(result.get('success'))
+        self.assertEqual(result.get('weight'), 3.0)
+        self.assertEqual(len(result.get('error')), 1)
+
+    def test_parallel_checks_given_up_on_are_killed(self):
+        # Given
+        user_answer = dedent(""" #!/bin/bash
+                             read A
+                             if [ $A -gt 0 ]; then sleep 3; fi
+                             echo -n `ulimit -n`
+                             """
+                             )
+        test_case_data = [{'expected_output': output,
+                           'expected_input': expected_input,
+                           'test_case_type': 'stdiobasedtestcase',
+                           'weight': 1.0
+                           } for expected_input, output in
+                          [('0', '256'), ('0', 'x'), ('1', ''), ('1', '')]]
+        kwargs = {
+                  'metadata': {
+                    'user_answer': user_answer,
+                    'file_paths': self.file_paths,
+                    'partial_grading': False,
+                    'language': 'bash'
+                    }, 'test_case_data': test_case_data,
+                  }
+        parallel_test_cases = grader_module.PARALLEL_TEST_CASES
+        fail_fast = grader_module.FAIL_FAST
+        grader_module.PARALLEL_TEST_CASES = 4
+        grader_module.FAIL_FAST = True
+
+        # When
+        start = time.time()
+        try:
+            result = Grader(self.in_dir).evaluate(kwargs)
+        finally:
+            grader_module.PARALLEL_TEST_CASES = parallel_test_cases
+            grader_module.FAIL_FAST = fail_fast
+        elapsed = time.time() - start
+
+        # Then
+        self.assertLess(elapsed, 2)
+        self.assertEqual(len(result.get('error')), 1)
+        self.assertEqual(Process(os.getpid()).children(recursive=True), [])
+
+    def test_fail_fast(self):
+        # Given
+        user_answer = dedent(""" #!/bin/bash
+                             read A
+                             echo -n $A
+                             """
+                             )
+        test_case_data = [{'expected_output': output,
+                           'expected_input': '1',
+                           'test_case_type': 'stdiobasedtestcase',
+                           'weight': 1.0
+                           } for output in ['1', '2', '3']]
+        kwargs = {
+                  'metadata': {
+                    'user_answer': user_answer,
+                    'file_paths': self.file_paths,
+                    'partial_grading': False,
+                    'language': 'bash'
+                    }, 'test_case_data': test_case_data,
+                  }
+        fail_fast = grader_module.FAIL_FAST
+        grader_module.FAIL_FAST = True
+
+        # When
+        try:
+            grader = Grader(self.in_dir)
+            result = grader.evaluate(kwargs)
+        finally:
+            grader_module.FAIL_FAST = fail_fast
+
+        # Then
+        self.assertFalse(result.get('success'))
+        self.assertEqual(len(result.get('error')), 1)
+        self.assertFalse(os.path.exists(os.path.join(self.in_dir, 'Test.sh')))
+
+        # When
+        kwargs['metadata']['partial_grading'] = True
+        grader_module.FAIL_FAST = True
+        try:
+            result = Grader(self.in_dir).evaluate(kwargs)
+        finally:
+            grader_module.FAIL_FAST = fail_fast
+
+        # Then
+        self.assertEqual(len(result.get('error')), 2)
+
+    def test_job_workspace(self):
+        # Given
+        user_answer = dedent(""" #!/bin/bash
+                             read A
+                             echo -n $A > out.txt
+                             cat out.txt
+                             """
+                             )
+        test_case_data = [{'expected_output': '1',
+                           'expected_input': '1',
+                           'test_case_type': 'stdiobasedtestcase',
+                           'weight': 0.0
+                           }]
+        kwargs = {
+                  'metadata': {
+                    'user_answer': user_answer,
+                    'file_paths': self.file_paths,
+                    'partial_grading': False,
+                    'language': 'bash'
+                    }, 'test_case_data': test_case_data,
+                  }
+        workspace_root = tempfile.mkdtemp()
+        user_dir = os.path.join(self.in_dir, 'user')
+
+        # When
+        try:
+            grader = Grader(user_dir, workspace_root=workspace_root)
+            result = grader.evaluate(kwargs)
+            workspaces = os.listdir(workspace_root)
+        finally:
+            shutil.rmtree(workspace_root)
+
+        # Then
+        self.assertTrue(result.get('success'))
+        self.assertEqual(workspaces, [])
+        self.assertFalse(os.path.exists(user_dir))
+
+    def test_resource_limits(self):
+        # Given
+        user_answer = dedent(""" #!/bin/bash
+                             echo -n `ulimit -n` `ulimit -t`
+                             """
+                             )
+        test_case_data = [{'expected_output': '256 %d' % SERVER_TIMEOUT,
+                           'test_case_type': 'stdiobasedtestcase',
+                           'weight': 0.0
+                           }]
+        kwargs = {
+                  'metadata': {
+                    'user_answer': user_answer,
+                    'file_paths': self.file_paths,
+                    'partial_grading': False,
+                    'language': 'bash'
+                    }, 'test_case_data': test_case_data,
+                  }
+
+        # When
+        grader = Grader(self.in_dir)
+        result = grader.evaluate(kwargs)
+
+        # Then
+        self.assertTrue(result.get('success'))
+
+    def test_test_case_timeout(self):
+        # Given
+        user_answer = dedent(""" #!/bin/bash
+                             sleep 3
+                             """
+                             )
+        test_case_data = [{'expected_output': '',
+                           'test_case_type': 'stdiobasedtestcase',
+                           'weight': 0.0
+                           }]
+        kwargs = {
+                  'metadata': {
+                    'user_answer': user_answer,
+                    'file_paths': self.file_paths,
+                    'partial_grading': False,
+                    'language': 'bash'
+                    }, 'test_case_data': test_case_data,
+                  }
+        test_case_timeout = grader_module.TEST_CASE_TIMEOUT
+        grader_module.TEST_CASE_TIMEOUT = 1
+
+        # When
+        start = time.time()
+        try:
+            grader = Grader(self.in_dir)
+            result = grader.evaluate(kwargs)
+        finally:
+            grader_module.TEST_CASE_TIMEOUT = test_case_timeout
+        elapsed = time.time() - start
+
+        # Then
+        self.assertLess(elapsed, 2.5)
+        self.assertFalse(result.get('success'))
+        self.assertEqual(result.get('error')[0]['exception'],
+                         'TimeoutException')
+
+
 if __name__ == '__main__':
     unittest.main()
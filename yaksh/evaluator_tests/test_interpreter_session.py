@@ -0,0 +1,172 @@
+from __future__ import unicode_literals
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from textwrap import dedent
+
+from yaksh import interpreter_session
+from yaksh.grader import TimeoutException
+from yaksh.interpreter_session import (
+    InterpreterSession, BashSession, get_session
+)
+
+
+class PythonSession(InterpreterSession):
+    """Runs Python scripts, so that sessions can be tested without R or
+    Scilab.
+    """
+    driver = dedent("""
+        import os, sys
+        for job in iter(sys.stdin.readline, ''):
+            directory, script = job.rstrip('\\n').split('\\t')
+            os.chdir(directory)
+            status = 0
+            try:
+                exec(open(script).read(), {})
+            except Exception as e:
+                print(e)
+                status = 1
+            print('@@yaksh-done', status, flush=True)
+        """)
+
+    def _get_command(self):
+        return [sys.executable, '-u', '-c', self.driver]
+
+    def _get_job(self, directory, script, args):
+        return '%s\t%s\n' % (directory, script)
+
+
+class InterpreterSessionTestCases(unittest.TestCase):
+    def setUp(self):
+        self.in_dir = tempfile.mkdtemp()
+        self.session = PythonSession()
+
+    def tearDown(self):
+        self.session.stop()
+        shutil.rmtree(self.in_dir)
+
+    def _run(self, code, timeout=5):
+        with open(os.path.join(self.in_dir, 'main.py'), 'w') as f:
+            f.write(code)
+        return self.session.run(self.in_dir, 'main.py', timeout)
+
+    def test_interpreter_is_kept_across_jobs(self):
+        # Given
+        self._run("x = 1")
+        pid = self.session.proc.pid
+
+        # When
+        status, output = self._run("print(x)")
+
+        # Then
+        self.assertEqual(self.session.proc.pid, pid)
+        self.assertEqual(status, 1)
+        self.assertIn("name 'x' is not defined", output)
+
+    def test_exit_status_of_script(self):
+        # When
+        status, output = self._run("print('hello')")
+
+        # Then
+        self.assertEqual(status, 0)
+        self.assertEqual(output.strip(), 'hello')
+
+    def test_interpreter_exiting(self):
+        # Given
+        self._run("pass")
+        pid = self.session.proc.pid
+
+        # When
+        status, output = self._run("import os; os._exit(5)")
+        next_status, output = self._run("pass")
+
+        # Then
+        self.assertEqual(status, 5)
+        self.assertEqual(next_status, 0)
+        self.assertNotEqual(self.session.proc.pid, pid)
+
+    def test_timeout_kills_interpreter(self):
+        # Given
+        self._run("pass")
+        pid = self.session.proc.pid
+
+        # When
+        with self.assertRaises(TimeoutException):
+            self._run("while True: pass", timeout=0.5)
+        status, output = self._run("pass")
+
+        # Then
+        self.assertEqual(status, 0)
+        self.assertNotEqual(self.session.proc.pid, pid)
+
+    def test_interpreter_restarted_after_jobs(self):
+        # Given
+        session_jobs = interpreter_session.INTERPRETER_SESSION_JOBS
+        interpreter_session.INTERPRETER_SESSION_JOBS = 2
+
+        # When
+        try:
+            pids = []
+            for i in range(3):
+                self._run("pass")
+                pids.append(self.session.proc.pid)
+        finally:
+            interpreter_session.INTERPRETER_SESSION_JOBS = session_jobs
+
+        # Then
+        self.assertEqual(pids[0], pids[1])
+        self.assertNotEqual(pids[1], pids[2])
+
+    def test_sessions_are_kept_per_process(self):
+        # When
+        session = get_session('r')
+
+        # Then
+        self.assertIs(get_session('r'), session)
+        self.assertIsNot(get_session('scilab'), session)
+        self.assertIsNone(session.proc)
+
+
+class BashSessionTestCases(unittest.TestCase):
+    def setUp(self):
+        self.in_dir = tempfile.mkdtemp()
+        self.script = os.path.join(self.in_dir, 'main.sh')
+        with open(self.script, 'w') as f:
+            f.write('echo $0 $# $2; echo oops >&2; exit 3\n')
+        self.cwd = os.getcwd()
+        os.chdir(self.in_dir)
+        self.session = BashSession()
+
+    def tearDown(self):
+        self.session.close()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.in_dir)
+
+    def test_scripts_run_in_one_process(self):
+        # When
+        first = self.session.run(self.script, ['1', '2'])
+        pid = self.session.proc.pid
+        second = self.session.run(self.script, ['a', 'b', 'c'])
+
+        # Then
+        self.assertEqual(first, (3, '%s 2 2\n' % self.script, 'oops\n'))
+        self.assertEqual(second, (3, '%s 3 b\n' % self.script, 'oops\n'))
+        self.assertEqual(self.session.proc.pid, pid)
+        self.assertEqual(os.listdir(self.in_dir), ['main.sh'])
+
+    def test_line_endings_are_kept(self):
+        # Given
+        with open(self.script, 'w') as f:
+            f.write("printf 'a\\r\\nb\\n'\n")
+
+        # When
+        status, stdout, stderr = self.session.run(self.script)
+
+        # Then
+        self.assertEqual(stdout, 'a\r\nb\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
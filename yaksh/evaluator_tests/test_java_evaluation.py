@@ -97,6 +97,37 @@ class JavaAssertionEvaluationTestCases(EvaluatorBaseTest):
         # Then
         self.assertTrue(result.get('success'))
 
+    def test_answer_is_compiled_once(self):
+        # Given
+        user_answer = ("class Test {\n\tint square_num(int a)"
+                       " {\n\treturn a*a;\n\t}\n}")
+        kwargs = {
+                  'metadata': {
+                    'user_answer': user_answer,
+                    'file_paths': self.file_paths,
+                    'partial_grading': False,
+                    'language': 'java'
+                    }, 'test_case_data': self.test_case_data * 2,
+                  }
+        class_path = os.path.join(self.in_dir, 'Test.class')
+
+        # When
+        grader = Grader(self.in_dir)
+        cwd = os.getcwd()
+        os.chdir(self.in_dir)
+        try:
+            first, second = grader.get_evaluator_objects(kwargs)
+            first.compile_code()
+            compiled_at = os.stat(class_path).st_mtime_ns
+            second.compile_code()
+            recompiled_at = os.stat(class_path).st_mtime_ns
+        finally:
+            os.chdir(cwd)
+
+        # Then
+        self.assertIs(first.compiled_user_answer, second.compiled_user_answer)
+        self.assertEqual(recompiled_at, compiled_at)
+
     def test_incorrect_answer(self):
         # Given
         user_answer = ("class Test {\n\tint square_num(int a) "
@@ -1,12 +1,16 @@
 from __future__ import unicode_literals
 import unittest
 import os
+import signal
 import tempfile
 import shutil
+import zipfile
 from textwrap import dedent
 
 # Local import
+from yaksh import grader, hook_evaluator
 from yaksh.grader import Grader
+from yaksh.file_cache import FileCache, support_file_cache
 from yaksh.settings import SERVER_TIMEOUT
 
 
@@ -356,6 +360,90 @@ class PythonAssertionEvaluationTestCases(EvaluatorBaseTest):
         # Then
         self.assertTrue(result.get('success'))
 
+    def test_grading_timings(self):
+        # Given
+        self.test_case_data = [{"test_case_type": "standardtestcase",
+                                "test_case": "assert(ans()=='2')",
+                                "weight": 0.0},
+                               {"test_case_type": "standardtestcase",
+                                "test_case": "assert(ans()=='3')",
+                                "weight": 0.0}
+                               ]
+        user_answer = dedent("""
+            def ans():
+                with open("test.txt") as f:
+                    return f.read()[0]
+            """)
+        kwargs = {'metadata': {
+                  'user_answer': user_answer,
+                  'file_paths': [(self.tmp_file, False)],
+                  'partial_grading': True,
+                  'language': 'python'},
+                  'test_case_data': self.test_case_data,
+                  }
+        grading_timings = grader.GRADING_TIMINGS
+        grader.GRADING_TIMINGS = True
+
+        # When
+        try:
+            result = Grader(self.in_dir).evaluate(kwargs)
+        finally:
+            grader.GRADING_TIMINGS = grading_timings
+        plain_result = Grader(self.in_dir).evaluate(kwargs)
+
+        # Then
+        timings = result.get('timings')
+        self.assertEqual(
+            sorted(timings),
+            ['check_code', 'compile_code', 'copy_files', 'setup', 'teardown']
+        )
+        self.assertEqual(len(timings['check_code']), 2)
+        self.assertTrue(all(seconds >= 0 for seconds in
+                            timings['check_code']))
+        self.assertNotIn('timings', plain_result)
+
+    def test_file_based_assert_with_file_cache(self):
+        # Given
+        cache_dir = tempfile.mkdtemp()
+        zip_path = os.path.join(cache_dir, 'data.zip')
+        with zipfile.ZipFile(zip_path, 'w') as zip_file:
+            zip_file.writestr('data/', '')
+            zip_file.writestr('data/num.txt', '3')
+        self.test_case_data = [{"test_case_type": "standardtestcase",
+                                "test_case": "assert(ans()=='23')",
+                                "weight": 0.0}
+                               ]
+        self.file_paths = [(self.tmp_file, False), (zip_path, True)]
+        user_answer = dedent("""
+            def ans():
+                with open("test.txt") as f, open("data/num.txt") as g:
+                    return f.read()[0] + g.read()
+            """)
+
+        kwargs = {'metadata': {
+                  'user_answer': user_answer,
+                  'file_paths': self.file_paths,
+                  'partial_grading': False,
+                  'language': 'python'},
+                  'test_case_data': self.test_case_data,
+                  }
+
+        # When
+        support_file_cache.directory = cache_dir
+        try:
+            results = [Grader(self.in_dir).evaluate(kwargs) for i in range(2)]
+        finally:
+            support_file_cache.directory = ''
+        cached = os.listdir(cache_dir)
+        shutil.rmtree(cache_dir)
+
+        # Then
+        self.assertTrue(all(result.get('success') for result in results))
+        # The zip file itself, and the two files and the extracted archive
+        # cached once.
+        self.assertEqual(len(cached), 4)
+        self.assertEqual(os.listdir(self.in_dir), [])
+
     def test_single_testcase_error(self):
         """ Tests the user answer with just an incorrect test case """
 
@@ -965,6 +1053,193 @@ class PythonHookEvaluationTestCases(EvaluatorBaseTest):
         # Then
         self.assertTrue(result.get('success'))
 
+    def _hook_kwargs(self, hook_code):
+        test_case_data = [{"test_case_type": "hooktestcase",
+                           "hook_code": hook_code, "weight": 1.0
+                           }]
+        return {'metadata': {
+                'user_answer': "def add(a,b):\n\treturn a + b",
+                'file_paths': self.file_paths,
+                'partial_grading': False,
+                'language': 'python'},
+                'test_case_data': test_case_data,
+                }
+
+    def test_compiled_hook_is_cached(self):
+        # Given
+        hook_code = dedent("""\
+                            def check_answer(user_answer):
+                                exec(user_answer, globals())
+                                return add(1, 2) == 3, "", 1.0
+                            """
+                           )
+        kwargs = self._hook_kwargs(hook_code)
+        Grader(self.in_dir).evaluate(kwargs)
+        code = hook_evaluator.get_compiled_hook(hook_code)
+
+        # When
+        result = Grader(self.in_dir).evaluate(kwargs)
+
+        # Then
+        self.assertTrue(result.get('success'))
+        self.assertIs(hook_evaluator.get_compiled_hook(hook_code), code)
+
+    def test_hook_run_in_child(self):
+        # Given
+        hook_code = dedent("""\
+                            import os
+                            def check_answer(user_answer):
+                                return os.getpid() != {0}, "", 1.0
+                            """.format(os.getpid())
+                           )
+        kwargs = self._hook_kwargs(hook_code)
+        hook_timeout = hook_evaluator.HOOK_TIMEOUT
+        hook_evaluator.HOOK_TIMEOUT = 5
+
+        # When
+        try:
+            result = Grader(self.in_dir).evaluate(kwargs)
+        finally:
+            hook_evaluator.HOOK_TIMEOUT = hook_timeout
+
+        # Then
+        self.assertTrue(result.get('success'))
+
+    def test_hook_killed_after_hook_timeout(self):
+        # Given
+        hook_code = dedent("""\
+                            def check_answer(user_answer):
+                                while True:
+                                    pass
+                            """
+                           )
+        kwargs = self._hook_kwargs(hook_code)
+        hook_timeout = hook_evaluator.HOOK_TIMEOUT
+        hook_evaluator.HOOK_TIMEOUT = 0.5
+
+        # When
+        try:
+            result = Grader(self.in_dir).evaluate(kwargs)
+        finally:
+            hook_evaluator.HOOK_TIMEOUT = hook_timeout
+
+        # Then
+        self.assertFalse(result.get('success'))
+        self.assertEqual(result.get('error')[0]['exception'],
+                         'TimeoutException')
+        self.assert_correct_output(
+            "Hook code took more than 0.5 seconds to run.",
+            result.get('error')[0]['message']
+        )
+
+    def test_hook_killed_by_a_signal(self):
+        # Given
+        hook_code = dedent("""\
+                            import os, signal
+                            def check_answer(user_answer):
+                                os.kill(os.getpid(), signal.SIGKILL)
+                            """
+                           )
+        kwargs = self._hook_kwargs(hook_code)
+        hook_timeout = hook_evaluator.HOOK_TIMEOUT
+        hook_evaluator.HOOK_TIMEOUT = 5
+
+        # When
+        try:
+            result = Grader(self.in_dir).evaluate(kwargs)
+        finally:
+            hook_evaluator.HOOK_TIMEOUT = hook_timeout
+
+        # Then
+        self.assertFalse(result.get('success'))
+        self.assertEqual(result.get('error')[0]['exception'], 'RuntimeError')
+        self.assert_correct_output(
+            "Hook code was killed by signal {0}.".format(signal.SIGKILL),
+            result.get('error')[0]['message']
+        )
+
+
+class FileCacheTestCases(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = FileCache(self.directory, max_size=20)
+        self.in_dir = tempfile.mkdtemp()
+        self.out_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        shutil.rmtree(self.in_dir)
+        shutil.rmtree(self.out_dir)
+
+    def _write(self, name, content):
+        path = os.path.join(self.in_dir, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_same_content_is_cached_once(self):
+        # Given
+        first = self._write('a.txt', 'data')
+        second = self._write('b.txt', 'data')
+
+        # When
+        files = self.cache.copy(first, False, self.out_dir)
+        files += self.cache.copy(second, False, self.out_dir)
+
+        # Then
+        self.assertEqual(files, ['a.txt', 'b.txt'])
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        with open(os.path.join(self.out_dir, 'b.txt')) as f:
+            self.assertEqual(f.read(), 'data')
+
+    def test_answers_cannot_change_the_cache(self):
+        # Given
+        path = self._write('a.txt', 'data')
+        self.cache.copy(path, False, self.out_dir)
+
+        # When
+        with open(os.path.join(self.out_dir, 'a.txt'), 'w') as f:
+            f.write('oops')
+        self.cache.copy(path, False, self.out_dir)
+        with open(os.path.join(self.out_dir, 'a.txt')) as f:
+            content = f.read()
+
+        # Then
+        self.assertEqual(content, 'data')
+
+    def test_least_recently_used_files_are_evicted(self):
+        # Given
+        paths = [self._write('%d.txt' % i, str(i) * 8) for i in range(3)]
+
+        # When
+        for path in paths:
+            self.cache.copy(path, False, self.out_dir)
+
+        # Then
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+        self.assertNotIn(self.cache.get_digest(paths[0]),
+                         os.listdir(self.directory))
+        self.assertEqual(len(os.listdir(self.out_dir)), 3)
+
+    def test_cache_hits_do_not_evict(self):
+        # Given
+        path = self._write('a.txt', 'data')
+        self.cache.copy(path, False, self.out_dir)
+        old_entry = os.path.join(self.directory, 'old')
+        os.mkdir(old_entry)
+        with open(os.path.join(old_entry, 'content'), 'w') as f:
+            f.write('0123456789' * 2)
+        os.utime(old_entry, (1000, 1000))
+
+        # When
+        self.cache.copy(path, False, self.out_dir)
+        kept_on_hit = os.path.isdir(old_entry)
+        self.cache.copy(self._write('b.txt', 'more'), False, self.out_dir)
+
+        # Then
+        self.assertTrue(kept_on_hit)
+        self.assertFalse(os.path.isdir(old_entry))
+
 
 if __name__ == '__main__':
     unittest.main()
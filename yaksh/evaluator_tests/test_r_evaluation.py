@@ -6,7 +6,9 @@ import tempfile
 import shutil
 from psutil import Process
 
+from yaksh import r_code_evaluator
 from yaksh.grader import Grader
+from yaksh.interpreter_session import get_session
 from yaksh.settings import SERVER_TIMEOUT
 from yaksh.evaluator_tests.test_python_evaluation import EvaluatorBaseTest
 
@@ -198,3 +200,50 @@ class RAssertionEvaluationTestCase(EvaluatorBaseTest):
         if parent_proc:
             children_procs = Process(parent_proc[0].pid)
             self.assertFalse(any(children_procs.children(recursive=True)))
+
+
+class RSessionAssertionEvaluationTestCase(RAssertionEvaluationTestCase):
+    """The same tests, with the answers run by a session of R, which must
+    grade them as Rscript does.
+    """
+    def setUp(self):
+        super(RSessionAssertionEvaluationTestCase, self).setUp()
+        self.sessions = r_code_evaluator.INTERPRETER_SESSIONS
+        r_code_evaluator.INTERPRETER_SESSIONS = ['r']
+
+    def tearDown(self):
+        r_code_evaluator.INTERPRETER_SESSIONS = self.sessions
+        get_session('r').stop()
+        super(RSessionAssertionEvaluationTestCase, self).tearDown()
+
+    def test_changes_to_base_do_not_outlive_the_job(self):
+        # Given
+        test_case_data = [{"test_case": dedent(
+                               '''
+                               source("function.r")
+                               if (pi > 3.1) quit("no", 31)
+                               '''),
+                           "test_case_type": "standardtestcase",
+                           "weight": 0.0}]
+        changing_answer = dedent(
+            '''
+            unlockBinding("pi", baseenv())
+            assign("pi", 3, envir = baseenv())
+            '''
+        )
+
+        # When
+        results = []
+        for user_answer in (changing_answer, "x <- 1"):
+            kwargs = {'metadata': {
+                      'user_answer': user_answer,
+                      'file_paths': self.file_paths,
+                      'partial_grading': False,
+                      'language': 'r'},
+                      'test_case_data': test_case_data,
+                      }
+            results.append(Grader(self.in_dir).evaluate(kwargs))
+
+        # Then
+        self.assertFalse(results[0].get('success'))
+        self.assertTrue(results[1].get('success'))
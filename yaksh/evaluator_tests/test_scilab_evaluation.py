@@ -7,8 +7,9 @@ from psutil import Process
 from textwrap import dedent
 
 # Local Import
-from yaksh import grader as gd
+from yaksh import grader as gd, scilab_code_evaluator
 from yaksh.grader import Grader
+from yaksh.interpreter_session import get_session
 from yaksh.evaluator_tests.test_python_evaluation import EvaluatorBaseTest
 
 
@@ -142,5 +143,20 @@ class ScilabEvaluationTestCases(EvaluatorBaseTest):
             self.assertFalse(any(children_procs.children(recursive=True)))
 
 
+class ScilabSessionEvaluationTestCases(ScilabEvaluationTestCases):
+    """The same tests, with the answers run by a session of Scilab, which
+    must grade them as scilab-cli does.
+    """
+    def setUp(self):
+        super(ScilabSessionEvaluationTestCases, self).setUp()
+        self.sessions = scilab_code_evaluator.INTERPRETER_SESSIONS
+        scilab_code_evaluator.INTERPRETER_SESSIONS = ['scilab']
+
+    def tearDown(self):
+        scilab_code_evaluator.INTERPRETER_SESSIONS = self.sessions
+        get_session('scilab').stop()
+        super(ScilabSessionEvaluationTestCases, self).tearDown()
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,158 @@
+"""A cache of the files of questions shared by all the code server
+processes.
+
+Every answer to a question with files gets its own copy of them, and of the
+archives extracted from them.  The cache keeps one read-only copy of each,
+under the hash of its content, and copies it into the directory of an
+answer from there, sharing its blocks where the file system can, instead of
+extracting archives again.  Like compiled code, the least recently used
+entries are removed once the cache grows beyond its size limit.
+"""
+
+from __future__ import unicode_literals
+from collections import OrderedDict
+import fcntl
+import hashlib
+import os
+import shutil
+import stat
+import zipfile
+
+# Local imports
+from .compile_cache import CompileCache
+from .settings import FILE_CACHE_DIR, FILE_CACHE_SIZE
+
+# The ioctl making a file share the blocks of another, on file systems such
+# as btrfs and XFS.
+FICLONE = 0x40049409
+
+# Most digests of files kept by a cache.
+MAX_DIGESTS = 4096
+
+
+class FileCache(CompileCache):
+    """Files kept in `directory`, at most `max_size` bytes of them.
+
+    Each entry is a directory, holding either a single file as `content` or
+    the files extracted from an archive.
+    """
+    def __init__(self, directory=FILE_CACHE_DIR, max_size=FILE_CACHE_SIZE):
+        super(FileCache, self).__init__(directory, max_size)
+        # Digests of the files already hashed, keyed by path, size and mtime,
+        # least recently used first.
+        self._digests = OrderedDict()
+
+    # Private Protocol ##########
+    def _get_size(self, path):
+        size = 0
+        for root, dirs, files in os.walk(path):
+            for name in files:
+                size += os.lstat(os.path.join(root, name)).st_size
+        return size
+
+    def _remove(self, path):
+        shutil.rmtree(path)
+
+    def _add(self, name, build):
+        """Returns the entry `name`, calling `build` with a new directory to
+        fill in when it is not cached, and whether it was added.
+        """
+        path = os.path.join(self.directory, name)
+        if os.path.isdir(path):
+            # Mark it as recently used.
+            os.utime(path, None)
+            return path, False
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory, exist_ok=True)
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+        os.mkdir(tmp_path)
+        try:
+            build(tmp_path)
+            read_only = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+            for root, dirs, files in os.walk(tmp_path):
+                for file_name in files:
+                    os.chmod(os.path.join(root, file_name), read_only)
+            os.rename(tmp_path, path)
+        except OSError:
+            # Another process added the entry first.
+            if not os.path.isdir(path):
+                raise
+            return path, False
+        finally:
+            if os.path.exists(tmp_path):
+                shutil.rmtree(tmp_path)
+        return path, True
+
+    def _copy(self, src, dest):
+        """Copy the cached file `src` to `dest`.  It is not linked, as the
+        answer could then change it for everyone.
+        """
+        if os.path.lexists(dest):
+            os.remove(dest)
+        with open(src, 'rb') as src_file, open(dest, 'wb') as dest_file:
+            try:
+                fcntl.ioctl(dest_file.fileno(), FICLONE, src_file.fileno())
+                return
+            except OSError:
+                # The file system cannot share blocks, or they are on two.
+                pass
+            shutil.copyfileobj(src_file, dest_file, 1024 * 1024)
+
+    # Public Protocol ##########
+    def get_digest(self, file_path):
+        """Returns the sha256 of the content of the file at `file_path`,
+        hashing it only when it changed since it was last hashed.
+        """
+        file_stat = os.stat(file_path)
+        key = (file_path, file_stat.st_size, file_stat.st_mtime)
+        if key in self._digests:
+            self._digests.move_to_end(key)
+        else:
+            digest = hashlib.sha256()
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            self._digests[key] = digest.hexdigest()
+            while len(self._digests) > MAX_DIGESTS:
+                self._digests.popitem(last=False)
+        return self._digests[key]
+
+    def copy(self, file_path, extract, path):
+        """Put the file at `file_path` in the directory `path`, extracting it
+        there too when `extract` is true and it is a zip file.
+
+        Returns the names of the files put in `path`, like `copy_files`.
+        """
+        file_name = os.path.basename(file_path)
+        digest = self.get_digest(file_path)
+        entry, added = self._add(
+            digest, lambda tmp: shutil.copy(file_path,
+                                            os.path.join(tmp, 'content'))
+        )
+        content = os.path.join(entry, 'content')
+        self._copy(content, os.path.join(path, file_name))
+        files = [file_name]
+        if extract and zipfile.is_zipfile(content):
+            with zipfile.ZipFile(content, 'r') as zip_file:
+                files.extend(zip_file.namelist())
+                extracted, extracted_added = self._add(
+                    digest + '-extracted', zip_file.extractall
+                )
+                added = added or extracted_added
+            for root, dirs, names in os.walk(extracted):
+                dest_root = os.path.join(
+                    path, os.path.relpath(root, extracted)
+                )
+                for name in dirs:
+                    os.makedirs(os.path.join(dest_root, name), exist_ok=True)
+                for name in names:
+                    self._copy(os.path.join(root, name),
+                               os.path.join(dest_root, name))
+        if added:
+            # The cache only grows when entries are added, so hits do not
+            # walk it.
+            self.evict()
+        return files
+
+
+support_file_cache = FileCache()
@@ -4,14 +4,28 @@ import zipfile
 import tempfile
 import csv
 
+# Local imports
+from .file_cache import support_file_cache
+from .grader import timed
+
 
 def copy_files(file_paths):
     """ Copy Files to current directory, takes
     tuple with file paths and extract status"""
 
+    with timed('copy_files'):
+        return _copy_files(file_paths)
+
+
+def _copy_files(file_paths):
     files = []
     for src in file_paths:
         file_path, extract = src
+        if support_file_cache.directory:
+            files.extend(
+                support_file_cache.copy(file_path, extract, os.getcwd())
+            )
+            continue
         file_name = os.path.basename(file_path)
         files.append(file_name)
         shutil.copy(file_path, os.getcwd())
@@ -3,18 +3,30 @@ from __future__ import unicode_literals
 import sys
 import os
 import contextlib
+from collections import OrderedDict
 from os.path import dirname, abspath
+import shutil
 import signal
+import tempfile
+import threading
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 
 # Local imports
-from .settings import SERVER_TIMEOUT
+from .settings import (
+    SERVER_TIMEOUT, PARALLEL_TEST_CASES, TEST_CASE_TIMEOUT, RESOURCE_LIMITS,
+    LANGUAGE_RESOURCE_LIMITS, FAIL_FAST, JOB_WORKSPACE_ROOT, GRADING_TIMINGS
+)
 from .language_registry import create_evaluator_instance
 from .error_messages import prettify_exceptions
 
 MY_DIR = abspath(dirname(__file__))
 registry = None
+# The timeline of the job being graded by this process, when timings are
+# collected.
+timeline = None
 
 
 # Raised when the code times-out.
@@ -67,13 +79,56 @@ def delete_signal_handler():
     return
 
 
+@contextlib.contextmanager
+def timed(phase, index=None):
+    """Add the seconds taken by the body to `phase` of the current
+    timeline, or to its `index`th entry for a phase timed per test case.
+    """
+    if timeline is None:
+        yield
+        return
+    current = timeline
+    start = time.time()
+    try:
+        yield
+    finally:
+        current.add(phase, time.time() - start, index)
+
+
+###############################################################################
+# `Timeline` class.
+###############################################################################
+class Timeline(object):
+    """Seconds spent in each phase of grading a job."""
+
+    def __init__(self):
+        self.phases = OrderedDict()
+        # Test cases checked in parallel add to it from several threads.
+        self._lock = threading.Lock()
+
+    def add(self, phase, seconds, index=None):
+        with self._lock:
+            if index is None:
+                self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+            else:
+                cases = self.phases.setdefault(phase, [])
+                cases.extend([0.0] * (index + 1 - len(cases)))
+                cases[index] += seconds
+
+
 class Grader(object):
     """Tests the code obtained from Code Server"""
-    def __init__(self, in_dir=None):
+    def __init__(self, in_dir=None, workspace_root=JOB_WORKSPACE_ROOT):
         msg = 'Code took more than %s seconds to run. You probably '\
               'have an infinite loop in your code.' % SERVER_TIMEOUT
         self.timeout_msg = msg
         self.in_dir = in_dir if in_dir else MY_DIR
+        # When set, each evaluation runs in a directory of its own created
+        # under this one, instead of in `in_dir`.
+        self.workspace_root = workspace_root
+        self.workspace = None
+        # Runs the checks of test cases checked in parallel.
+        self._executor = None
 
     def evaluate(self, kwargs):
         """Evaluates given code with the test cases based on
@@ -89,25 +144,45 @@ class Grader(object):
 
         If the optional `in_dir` keyword argument is supplied it changes the
         directory to that directory (it does not change it back to the original
-        when done).
+        when done).  With a `workspace_root` a fresh directory under it is
+        used instead, and removed as a whole when done.
 
         Returns
         -------
 
-        A tuple: (success, error, weight).
+        A dict with the `success`, `error` and `weight` of the answer, and
+        the `timings` of the phases of grading it when GRADING_TIMINGS is
+        set.
         """
-        self.setup()
-        test_case_instances = self.get_evaluator_objects(kwargs)
-        with change_dir(self.in_dir):
-            success, error, weight = self.safe_evaluate(test_case_instances)
-        self.teardown()
+        global timeline
+        timeline = Timeline() if GRADING_TIMINGS else None
+        timings = timeline
+        try:
+            with timed('setup'):
+                self.setup()
+            try:
+                test_case_instances = self.get_evaluator_objects(kwargs)
+                with change_dir(self.workspace or self.in_dir):
+                    success, error, weight = self.safe_evaluate(
+                        test_case_instances
+                    )
+            finally:
+                with timed('teardown'):
+                    self.teardown()
+        finally:
+            timeline = None
 
         result = {'success': success, 'error': error, 'weight': weight}
+        if timings is not None:
+            result['timings'] = timings.phases
         return result
 
     # Private Protocol ##########
     def setup(self):
-        if self.in_dir:
+        if self.workspace_root:
+            self.workspace = tempfile.mkdtemp(prefix='job_',
+                                              dir=self.workspace_root)
+        elif self.in_dir:
             if not os.path.exists(self.in_dir):
                 os.makedirs(self.in_dir)
 
@@ -115,9 +190,17 @@ class Grader(object):
         metadata = kwargs.get('metadata')
         test_case_data = kwargs.get('test_case_data')
         test_case_instances = []
+        compile_cache = {}
+        resource_limits = dict(RESOURCE_LIMITS)
+        resource_limits.update(
+            LANGUAGE_RESOURCE_LIMITS.get(metadata.get('language'), {})
+        )
 
         for test_case in test_case_data:
             test_case_instance = create_evaluator_instance(metadata, test_case)
+            test_case_instance.compile_cache = compile_cache
+            test_case_instance.resource_limits = resource_limits
+            test_case_instance.check_timeout = TEST_CASE_TIMEOUT
             test_case_instances.append(test_case_instance)
         return test_case_instances
 
@@ -135,13 +218,21 @@ class Grader(object):
         error = []
         weight = 0.0
 
+        checks = None
+        compiled = test_case_instances
+
         # Do whatever testing needed.
         try:
+            checks = self.start_parallel_checks(test_case_instances)
             # Run evaluator selection registry here
             for idx, test_case_instance in enumerate(test_case_instances):
                 test_case_success = False
-                test_case_instance.compile_code()
-                eval_result = test_case_instance.check_code()
+                if checks is None:
+                    with timed('compile_code'):
+                        test_case_instance.compile_code()
+                    eval_result = self._check(idx, test_case_instance)
+                else:
+                    eval_result = checks[idx].result()
                 test_case_success, err, mark_fraction = eval_result
                 if not isinstance(err, dict):
                     err = prettify_exceptions('Error', err)
@@ -151,11 +242,24 @@ class Grader(object):
                 else:
                     error.append(err)
                 test_case_success_status[idx] = test_case_success
+                if FAIL_FAST and not test_case_success and \
+                        not test_case_instance.partial_grading:
+                    # The answer gets no marks now whatever the other test
+                    # cases say, so do not run them.
+                    if checks is None:
+                        compiled = test_case_instances[:idx + 1]
+                    break
 
             success = all(test_case_success_status)
+            if checks is not None:
+                # Before the files the checks use are removed.
+                self.stop_parallel_checks(checks, test_case_instances)
 
-            for test_case_instance in test_case_instances:
-                test_case_instance.teardown()
+            if not self.workspace:
+                # A workspace is removed as a whole instead.
+                with timed('teardown'):
+                    for test_case_instance in compiled:
+                        test_case_instance.teardown()
 
         except TimeoutException:
             error.append(
@@ -181,11 +285,54 @@ class Grader(object):
                     )
                 )
         finally:
+            if checks is not None:
+                self.stop_parallel_checks(checks, test_case_instances)
             # Set back any original signal handler.
             set_original_signal_handler(prev_handler)
 
         return success, error, weight
 
+    def start_parallel_checks(self, test_case_instances):
+        """Compile the test cases and start checking them in parallel,
+        returning a future for the result of each.
+
+        This is done when PARALLEL_TEST_CASES is more than 1 and every
+        evaluator can be checked alongside the others, otherwise None is
+        returned and the test cases are to be compiled and checked one at a
+        time.
+        """
+        parallel = PARALLEL_TEST_CASES > 1 and len(test_case_instances) > 1 \
+            and all(t.parallel_check for t in test_case_instances)
+        if not parallel:
+            return None
+        with timed('compile_code'):
+            for test_case_instance in test_case_instances:
+                test_case_instance.compile_code()
+        self._executor = ThreadPoolExecutor(PARALLEL_TEST_CASES)
+        checks = [self._executor.submit(self._check, idx, t)
+                  for idx, t in enumerate(test_case_instances)]
+        return checks
+
+    def stop_parallel_checks(self, checks, test_case_instances):
+        """Give up on the checks started by `start_parallel_checks` that
+        have not finished, killing the processes they run, and wait for
+        their threads to end.
+        """
+        for check in checks:
+            check.cancel()
+        for test_case_instance in test_case_instances:
+            test_case_instance.kill_processes()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _check(self, idx, test_case_instance):
+        with timed('check_code', idx):
+            return test_case_instance.check_code()
+
     def teardown(self):
         # Cancel the signal
         delete_signal_handler()
+        if self.workspace:
+            shutil.rmtree(self.workspace, ignore_errors=True)
+            self.workspace = None
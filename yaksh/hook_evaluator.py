@@ -1,5 +1,11 @@
 #!/usr/bin/env python
+from collections import OrderedDict
+import hashlib
+import json
+import select
+import signal
 import sys
+import time
 import traceback
 import os
 import psutil
@@ -9,6 +15,30 @@ from .file_utils import copy_files, delete_files
 from .base_evaluator import BaseEvaluator
 from .grader import TimeoutException
 from .error_messages import prettify_exceptions
+from .settings import HOOK_TIMEOUT
+
+# Most compiled hooks kept by a code server process.
+MAX_COMPILED_HOOKS = 256
+
+# Compiled hook code, keyed by the sha256 of its source, least recently used
+# first.
+compiled_hooks = OrderedDict()
+
+
+def get_compiled_hook(hook_code):
+    """Returns the code object of `hook_code`, compiling it only the first
+    time it is seen by this process.
+    """
+    key = hashlib.sha256(hook_code.encode('utf-8')).hexdigest()
+    code = compiled_hooks.get(key)
+    if code is None:
+        code = compile(hook_code, '<string>', mode='exec')
+        compiled_hooks[key] = code
+        if len(compiled_hooks) > MAX_COMPILED_HOOKS:
+            compiled_hooks.popitem(last=False)
+    else:
+        compiled_hooks.move_to_end(key)
+    return code
 
 
 class HookEvaluator(BaseEvaluator):
@@ -59,22 +89,26 @@ class HookEvaluator(BaseEvaluator):
             self.files = copy_files(self.file_paths)
         if self.assignment_files:
             self.assign_files = copy_files(self.assignment_files)
+        if HOOK_TIMEOUT:
+            return self._run_hook_in_child(HOOK_TIMEOUT)
+        try:
+            return self._run_hook()
+        except TimeoutException:
+            processes = psutil.Process(os.getpid()).children(recursive=True)
+            for process in processes:
+                process.kill()
+            raise
+
+    # Private Protocol ##########
+    def _run_hook(self):
         success = False
         mark_fraction = 0.0
         try:
-            _tests = compile(self.hook_code, '<string>', mode='exec')
             hook_scope = {}
-            exec(_tests, hook_scope)
+            exec(get_compiled_hook(self.hook_code), hook_scope)
             check = hook_scope["check_answer"]
-            try:
-                success, err, mark_fraction = check(self.user_answer)
-            except Exception:
-                raise
-
+            success, err, mark_fraction = check(self.user_answer)
         except TimeoutException:
-            processes = psutil.Process(os.getpid()).children(recursive=True)
-            for process in processes:
-                process.kill()
             raise
         except Exception:
             exc_type, exc_value, exc_tb = sys.exc_info()
@@ -91,3 +125,65 @@ class HookEvaluator(BaseEvaluator):
                                       )
 
         return success, err, mark_fraction
+
+    def _run_hook_in_child(self, timeout):
+        """Run the hook in a child forked from this process, in a process
+        group of its own, which is killed after `timeout` seconds.
+        """
+        # Compiled here, so that the code object is kept for the next jobs.
+        try:
+            get_compiled_hook(self.hook_code)
+        except Exception:
+            return self._run_hook()
+        read_end, write_end = os.pipe()
+        child = os.fork()
+        if child == 0:
+            os.close(read_end)
+            status = 1
+            try:
+                os.setpgrp()
+                result = self._run_hook()
+                with os.fdopen(write_end, 'wb') as f:
+                    f.write(json.dumps(result, default=str).encode('utf-8'))
+                status = 0
+            finally:
+                os._exit(status)
+        os.close(write_end)
+        output = b''
+        deadline = time.time() + timeout
+        try:
+            while True:
+                ready, _, _ = select.select(
+                    [read_end], [], [], max(deadline - time.time(), 0)
+                )
+                if not ready:
+                    break
+                data = os.read(read_end, 65536)
+                if not data:
+                    break
+                output += data
+        finally:
+            os.close(read_end)
+            try:
+                os.killpg(child, signal.SIGKILL)
+            except OSError:
+                # The child has not made its process group yet.
+                os.kill(child, signal.SIGKILL)
+            pid, status = os.waitpid(child, 0)
+        if not ready:
+            msg = "Hook code took more than {0} seconds to run.".format(
+                timeout
+            )
+            return False, prettify_exceptions("TimeoutException", msg), 0.0
+        if not output:
+            if os.WIFSIGNALED(status):
+                msg = "Hook code was killed by signal {0}.".format(
+                    os.WTERMSIG(status)
+                )
+            else:
+                msg = "Hook code ended with exit code {0}.".format(
+                    os.WEXITSTATUS(status)
+                )
+            return False, prettify_exceptions("RuntimeError", msg), 0.0
+        success, err, mark_fraction = json.loads(output.decode('utf-8'))
+        return success, err, mark_fraction
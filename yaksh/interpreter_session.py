@@ -0,0 +1,393 @@
+"""Interpreters kept running across scripts, so that R and Scilab code need
+not wait for an interpreter to start for every test case, nor Bash code for
+every set of arguments it is tested with.
+
+A session is a single interpreter process, kept by a code server process
+across jobs for R and Scilab, which runs one script at a time in the
+directory of the job.  R runs each script in a child it forks, which takes
+whatever the script changed with it, and Scilab wipes what the script
+defined and the settings it changed before the next one.
+Calls that would end the interpreter, such as `quit` in R or `exit` in
+Scilab, end the script instead, with their status standing for the exit
+code of the process.  A session that times out, or whose interpreter exits
+anyway, is killed and started afresh for the next job, as it is every
+`INTERPRETER_SESSION_JOBS` jobs.
+"""
+
+from __future__ import unicode_literals
+import os
+import selectors
+import shutil
+import signal
+import subprocess
+import tempfile
+import time
+
+# Local imports
+from .grader import TimeoutException
+from .settings import INTERPRETER_SESSION_JOBS, OUTPUT_LIMIT
+
+
+# Printed by the interpreter, followed by the status, once a script is done.
+DONE_MARKER = '@@yaksh-done'
+
+R_DRIVER = r'''
+local({
+    jobs <- file("stdin")
+    open(jobs)
+    loadNamespace("parallel")
+    end_script <- function(save = "default", status = 0, runLast = TRUE) {
+        stop(structure(
+            class = c("yaksh_quit", "condition"),
+            list(message = "quit", call = NULL, status = status)
+        ))
+    }
+    run_job <- function(directory, script) {
+        setwd(directory)
+        out <- file(".yaksh_stdout", open = "wt")
+        err <- file(".yaksh_stderr", open = "wt")
+        sink(out)
+        sink(err, type = "message")
+        assign("quit", end_script, envir = globalenv())
+        assign("q", end_script, envir = globalenv())
+        status <- tryCatch(
+            withCallingHandlers({
+                source(script, print.eval = TRUE)
+                0
+            }, warning = function(w) {
+                message("Warning message:\nIn ",
+                        deparse(conditionCall(w))[1], " : ",
+                        conditionMessage(w))
+                invokeRestart("muffleWarning")
+            }),
+            yaksh_quit = function(q) q$status,
+            error = function(e) {
+                call <- conditionCall(e)
+                if (is.null(call)) {
+                    message("Error: ", conditionMessage(e))
+                } else {
+                    message("Error in ", deparse(call)[1], " : ",
+                            conditionMessage(e))
+                }
+                message("Execution halted")
+                1
+            }
+        )
+        while (sink.number() > 0) sink()
+        sink(type = "message")
+        close(out)
+        close(err)
+        status
+    }
+    repeat {
+        job <- readLines(jobs, n = 1)
+        if (length(job) == 0) break
+        job <- strsplit(job, "\t", fixed = TRUE)[[1]]
+        # Each script runs in a child forked off this interpreter, so that
+        # nothing it changes, be it in the global environment, in base or in
+        # the namespace of a package, outlives it.
+        child <- parallel::mcparallel(run_job(job[1], job[2]))
+        status <- parallel::mccollect(child)[[1]]
+        # A child that exited without a status, or failed, stands for an
+        # Rscript that did.
+        if (!is.numeric(status)) status <- 1
+        cat("@@yaksh-done", status, "\n")
+        flush(stdout())
+    }
+})
+'''
+
+# Sent to Scilab for every job, with the directory and the script.  Scilab
+# cannot fork, so the variables, files and settings of the interpreter a
+# script may have changed are set back to those of a fresh one first.
+# Scilab may echo it, so the markers are spelt out in pieces.
+SCILAB_JOB = (
+    'clear; clearglobal; mclose("all"); funcprot(1); format("v", 10); '
+    'ieee(0); warning("on"); rand("seed", 0); rand("uniform"); '
+    'grand("setgen", "mt"); grand("setsd", 5489); cd("{0}"); '
+    'yaksh_ierr = exec("{1}", "errcatch", 2); '
+    'if yaksh_ierr == 0 then yaksh_status = 0; else '
+    '[yaksh_msg, yaksh_ierr] = lasterror(); '
+    'yaksh_status = strtod(strsubst(yaksh_msg, "@@yaksh" + "-exit ", "")); '
+    'if isnan(yaksh_status) then yaksh_status = 1; '
+    'mprintf("!--error %d\\n%s\\n", yaksh_ierr, yaksh_msg); end; end; '
+    'mprintf("\\n%s %d\\n", "@@yaksh" + "-done", yaksh_status);\n'
+)
+
+# Runs each script in a subshell, which costs a fork where running it with
+# bash would cost a fork and an exec, with the arguments it is sent.  Output
+# is limited with the size of the files it is written to, in 1024 byte
+# blocks.
+BASH_DRIVER = r'''
+ulimit -f {0}
+while IFS=$'\t' read -r -a __yaksh_job; do
+    (
+        BASH_ARGV0=${{__yaksh_job[1]}}
+        . "${{__yaksh_job[1]}}" "${{__yaksh_job[@]:2}}"
+    ) >"${{__yaksh_job[0]}}/.yaksh_stdout" \
+      2>"${{__yaksh_job[0]}}/.yaksh_stderr" </dev/null
+    echo "@@yaksh-done $?"
+done
+'''
+
+SCILAB_DRIVER = (
+    'lines(0); mode(-1); funcprot(0); '
+    'function exit(status), if argn(2) == 0 then status = 0; end; '
+    'error(msprintf("%s %d", "@@yaksh" + "-exit", status)); endfunction; '
+    'quit = exit; abort = exit; predef("all");\n'
+)
+
+
+###############################################################################
+# `InterpreterSession` class.
+###############################################################################
+class InterpreterSession(object):
+    """An interpreter process running the scripts it is sent, one at a
+    time.
+    """
+
+    def __init__(self):
+        self.proc = None
+        self.jobs = 0
+
+    # Private Protocol ##########
+    def _get_command(self):
+        raise NotImplementedError("_get_command method not implemented")
+
+    def _get_driver(self):
+        """Returns what is written to the interpreter once it has started.
+        """
+        return ''
+
+    def _get_job(self, directory, script, args):
+        raise NotImplementedError("_get_job method not implemented")
+
+    def _start(self, preexec_fn):
+        # The interpreter must lead a process group of its own, so that
+        # stopping it also stops the processes it started.
+        self.proc = subprocess.Popen(
+            self._get_command(), stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            preexec_fn=preexec_fn or os.setpgrp
+        )
+        self.jobs = 0
+        driver = self._get_driver()
+        if driver:
+            self._write(driver)
+
+    def _read_outputs(self, directory):
+        """Returns the stdout and stderr of a script that were written to
+        files in `directory`, removing the files.
+        """
+        outputs = []
+        for name in ('.yaksh_stdout', '.yaksh_stderr'):
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                # Read as bytes, so that line endings are kept as they are.
+                with open(path, 'rb') as f:
+                    outputs.append(
+                        f.read(OUTPUT_LIMIT).decode('utf-8', 'replace')
+                    )
+                os.remove(path)
+            else:
+                outputs.append('')
+        return outputs
+
+    def _write(self, text):
+        self.proc.stdin.write(text.encode('utf-8'))
+        self.proc.stdin.flush()
+
+    def _read_status(self, timeout):
+        """Read the interpreter's output up to the end of the script.
+
+        Returns a tuple (status, output) with the status the script ended
+        with, or the exit code of the interpreter when it exited, and what it
+        printed.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        output = b''
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.proc.stdout, selectors.EVENT_READ)
+            marker = DONE_MARKER.encode('utf-8')
+            while marker not in output:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise TimeoutException('Code took too long to run.')
+                if not selector.select(remaining):
+                    continue
+                data = os.read(self.proc.stdout.fileno(), 32768)
+                if not data:
+                    self.proc.wait()
+                    return self.proc.returncode, output.decode(
+                        'utf-8', 'ignore'
+                    )
+                output += data
+                if len(output) > OUTPUT_LIMIT and marker not in output:
+                    self.stop()
+                    return -signal.SIGKILL, output[:OUTPUT_LIMIT].decode(
+                        'utf-8', 'ignore'
+                    )
+            while b'\n' not in output.rsplit(marker, 1)[1]:
+                data = os.read(self.proc.stdout.fileno(), 32768)
+                if not data:
+                    break
+                output += data
+        output, status = output.rsplit(marker, 1)
+        return int(float(status.split(b'\n')[0])), output.decode(
+            'utf-8', 'ignore'
+        )
+
+    # Public Protocol ##########
+    def run(self, directory, script, timeout=None, preexec_fn=None,
+            args=()):
+        """Run the file `script` in `directory`, with the arguments `args`
+        where the interpreter takes any, waiting at most `timeout` seconds
+        for it.  The interpreter is started with `preexec_fn`, which must put
+        it in a process group of its own, when it is not running.
+
+        Returns a tuple (status, output) like `_read_status`.
+        """
+        if self.proc is None or self.proc.poll() is not None or \
+                self.jobs >= INTERPRETER_SESSION_JOBS:
+            self.stop()
+            self._start(preexec_fn)
+        self.jobs += 1
+        try:
+            self._write(self._get_job(directory, script, args))
+            status, output = self._read_status(timeout)
+        except BaseException:
+            # The script is still running, so throw the interpreter away.
+            self.stop()
+            raise
+        if self.proc.poll() is not None:
+            self.stop()
+        return status, output
+
+    def stop(self):
+        """Kill the interpreter along with any process it started."""
+        if self.proc is None:
+            return
+        try:
+            os.killpg(self.proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+        self.proc.stdin.close()
+        self.proc.stdout.close()
+        self.proc = None
+
+
+###############################################################################
+# `RSession` class.
+###############################################################################
+class RSession(InterpreterSession):
+    """An R session, which writes the output of a script to `.yaksh_stdout`
+    and `.yaksh_stderr` in its directory.
+    """
+
+    def __init__(self):
+        super(RSession, self).__init__()
+        self.driver_path = None
+
+    def _get_command(self):
+        if self.driver_path is None:
+            fd, self.driver_path = tempfile.mkstemp(suffix='.r')
+            with os.fdopen(fd, 'w') as f:
+                f.write(R_DRIVER)
+        return ['Rscript', '--vanilla', self.driver_path]
+
+    def _get_job(self, directory, script, args):
+        return '%s\t%s\n' % (directory, script)
+
+    def run(self, directory, script, timeout=None, preexec_fn=None,
+            args=()):
+        """Returns a tuple (status, stdout, stderr) of the script."""
+        try:
+            status, output = super(RSession, self).run(
+                directory, script, timeout, preexec_fn
+            )
+        finally:
+            if self.driver_path is not None:
+                # R has read all of it by the time it ran a script, or it
+                # has been killed.
+                os.remove(self.driver_path)
+                self.driver_path = None
+        stdout, stderr = self._read_outputs(directory)
+        return status, stdout, stderr
+
+
+###############################################################################
+# `ScilabSession` class.
+###############################################################################
+class ScilabSession(InterpreterSession):
+    """A Scilab session, whose scripts' output is all on stdout."""
+
+    def _get_command(self):
+        return ['scilab-cli', '-nb']
+
+    def _get_driver(self):
+        return SCILAB_DRIVER
+
+    def _get_job(self, directory, script, args):
+        return SCILAB_JOB.format(directory.replace('"', '""'),
+                                 script.replace('"', '""'))
+
+
+###############################################################################
+# `BashSession` class.
+###############################################################################
+class BashSession(InterpreterSession):
+    """A bash process running scripts, and the arguments they are given, in
+    the directory it was started in.  Their output is written to files in a
+    directory of the session's own.
+    """
+
+    def __init__(self):
+        super(BashSession, self).__init__()
+        self.output_dir = None
+
+    def _get_command(self):
+        return ['bash', '-c', BASH_DRIVER.format(OUTPUT_LIMIT//1024 + 1)]
+
+    def _get_job(self, directory, script, args):
+        return '\t'.join([directory, script] + list(args)) + '\n'
+
+    def run(self, script, args=(), timeout=None, preexec_fn=None):
+        """Returns a tuple (status, stdout, stderr) of the script."""
+        if self.output_dir is None:
+            self.output_dir = tempfile.mkdtemp()
+        status, output = super(BashSession, self).run(
+            self.output_dir, script, timeout, preexec_fn, args
+        )
+        stdout, stderr = self._read_outputs(self.output_dir)
+        return status, stdout, stderr
+
+    def close(self):
+        """Stop bash and remove the session's directory."""
+        self.stop()
+        if self.output_dir is not None:
+            shutil.rmtree(self.output_dir, ignore_errors=True)
+            self.output_dir = None
+
+
+SESSION_CLASSES = {'r': RSession, 'scilab': ScilabSession}
+
+# Sessions of this process, keyed by language.  A process forked off keeps
+# none of them as it does not own their interpreters.
+_sessions = {}
+_sessions_pid = None
+
+
+def get_session(language):
+    """Returns the session of `language` for this process."""
+    global _sessions_pid
+    if _sessions_pid != os.getpid():
+        _sessions.clear()
+        _sessions_pid = os.getpid()
+    if language not in _sessions:
+        _sessions[language] = SESSION_CLASSES[language]()
+    return _sessions[language]
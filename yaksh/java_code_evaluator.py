@@ -62,9 +62,6 @@ class JavaCodeEvaluator(BaseEvaluator):
             # create student code and moderator code file
             self.submit_code_path = self.create_submit_code_file('Test.java')
             self.test_code_path = self.create_submit_code_file('main.java')
-            self.write_to_submit_code_file(
-                self.submit_code_path, self.user_answer
-                )
             self.write_to_submit_code_file(self.test_code_path, self.test_case)
             clean_ref_code_path = self.test_code_path
             if self.file_paths:
@@ -88,12 +85,18 @@ class JavaCodeEvaluator(BaseEvaluator):
                 clean_ref_code_path,
                 user_code_directory
             )
+            if not self._has_run_once(compile_command):
+                # Written only once, as javac compiles the test case code
+                # against Test.java instead of Test.class when it is newer.
+                self.write_to_submit_code_file(
+                    self.submit_code_path, self.user_answer
+                )
             self.run_command_args = "java -cp {0} {1}".format(
                 user_code_directory,
                 ref_file_name
             )
 
-            self.compiled_user_answer = self._run_command(
+            self.compiled_user_answer = self._run_command_once(
                 compile_command,
                 shell=True,
                 stdout=subprocess.PIPE,
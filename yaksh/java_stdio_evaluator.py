@@ -29,6 +29,8 @@ class JavaStdIOEvaluator(StdIOEvaluator):
     def teardown(self):
         if os.path.exists(self.submit_code_path):
             os.remove(self.submit_code_path)
+        if os.path.exists(self.user_output_path):
+            os.remove(self.user_output_path)
         if self.files:
             delete_files(self.files)
 
@@ -53,11 +55,10 @@ class JavaStdIOEvaluator(StdIOEvaluator):
                                                     'Test'
                                                     )
         self.compile_command = self.get_commands()
-        self.compiled_user_answer = self._run_command(self.compile_command,
-                                                      shell=True,
-                                                      stdout=subprocess.PIPE,
-                                                      stderr=subprocess.PIPE
-                                                      )
+        self.compiled_user_answer = self._run_command_once(
+            self.compile_command, shell=True, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
         return self.compiled_user_answer
 
     def check_code(self):
@@ -66,18 +67,16 @@ class JavaStdIOEvaluator(StdIOEvaluator):
         proc, stdnt_out, stdnt_stderr = self.compiled_user_answer
         stdnt_stderr = self._remove_null_substitute_char(stdnt_stderr)
         if stdnt_stderr == '' or "error" not in stdnt_stderr:
-            proc = subprocess.Popen("java Test",
-                                    shell=True,
-                                    stdin=subprocess.PIPE,
-                                    stdout=subprocess.PIPE,
-                                    stderr=subprocess.PIPE,
-                                    preexec_fn=os.setpgrp
-                                    )
+            proc = self._popen("java Test",
+                               shell=True,
+                               stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE
+                               )
             success, err = self.evaluate_stdio(self.user_answer, proc,
                                                self.expected_input,
                                                self.expected_output
                                                )
-            os.remove(self.user_output_path)
         else:
             err = "Compilation Error:"
             try:
@@ -1,10 +1,12 @@
 from __future__ import unicode_literals
 import importlib
+import logging
 
 # Local imports
 from .settings import code_evaluators
 
 registry = None
+logger = logging.getLogger(__name__)
 
 
 def get_registry():
@@ -26,9 +28,19 @@ def create_evaluator_instance(metadata, test_case):
 class _LanguageRegistry(object):
     def __init__(self):
         self._register = {}
+        # Classes already loaded, keyed by their dotted path.
+        self._classes = {}
         for language, module in code_evaluators.items():
             self._register[language] = None
 
+    # Private Protocol ##########
+    def _load_class(self, cls):
+        module_name, class_name = cls.rsplit(".", 1)
+        # load the module, will raise ImportError if module cannot be loaded
+        get_module = importlib.import_module(module_name)
+        # get the class, will raise AttributeError if class cannot be found
+        return getattr(get_module, class_name)
+
     # Public Protocol ##########
     def get_class(self, language, test_case_type):
         """ Get the code evaluator class for the given language """
@@ -36,13 +48,28 @@ class _LanguageRegistry(object):
             self._register[language] = code_evaluators.get(language)
         test_case_register = self._register[language]
         cls = test_case_register.get(test_case_type)
-        module_name, class_name = cls.rsplit(".", 1)
-        # load the module, will raise ImportError if module cannot be loaded
-        get_module = importlib.import_module(module_name)
-        # get the class, will raise AttributeError if class cannot be found
-        get_class = getattr(get_module, class_name)
+        get_class = self._classes.get(cls)
+        if get_class is None:
+            get_class = self._classes[cls] = self._load_class(cls)
         return get_class
 
+    def preload(self):
+        """ Load the evaluator classes of all the languages.  Classes that
+        cannot be loaded are logged and skipped, and fail only the jobs that
+        need them.
+        """
+        for language, test_case_register in self._register.items():
+            test_case_register = test_case_register or \
+                code_evaluators.get(language, {})
+            for test_case_type in test_case_register:
+                try:
+                    self.get_class(language, test_case_type)
+                except (ImportError, AttributeError):
+                    logger.exception(
+                        "Could not load the %s evaluator for %s",
+                        test_case_type, language
+                    )
+
     def register(self, language, class_names):
         """ Register a new code evaluator class for language"""
         self._register[language] = class_names
@@ -50,7 +50,8 @@ from django.db.models.fields.files import FieldFile
 from django.core.files.base import ContentFile
 # Local Imports
 from yaksh.code_server import (
-    submit, get_result as get_result_from_code_server
+    submit, get_result as get_result_from_code_server, submit_batch,
+    get_results as get_results_from_code_server, INTERACTIVE, BACKGROUND
 )
 from yaksh.settings import SERVER_POOL_PORT, SERVER_HOST_NAME
 from .file_utils import extract_files, delete_files
@@ -2541,7 +2542,7 @@ class AnswerPaper(models.Model):
         return dict(category_question_map)
 
     def validate_answer(self, user_answer, question, json_data=None, uid=None,
-                        server_port=SERVER_POOL_PORT):
+                        server_port=SERVER_POOL_PORT, lane=None):
         """
             Checks whether the answer submitted by the user is right or wrong.
             If right then returns correct = True, success and
@@ -2549,6 +2550,9 @@ class AnswerPaper(models.Model):
             success is True for MCQ's and multiple correct choices because
             only one attempt are allowed for them.
             For code questions success is True only if the answer is correct.
+            Code is checked in the code server's `lane`, by default answers
+            from moderators trying out questions go in the background lane
+            so that students are served first.
         """
 
         result = {'success': False, 'error': ['Incorrect answer'],
@@ -2613,11 +2617,18 @@ class AnswerPaper(models.Model):
             elif question.type == 'code' or question.type == "upload":
                 user_dir = self.user.profile.get_user_dir()
                 url = '{0}:{1}'.format(SERVER_HOST_NAME, server_port)
-                submit(url, uid, json_data, user_dir)
+                if lane is None:
+                    lane = BACKGROUND if self.course and \
+                        self.course.is_trial else INTERACTIVE
+                submit(url, uid, json_data, user_dir, lane)
                 result = {'uid': uid, 'status': 'running'}
         return result
 
-    def regrade(self, question_id, server_port=SERVER_POOL_PORT):
+    def _get_regrade_answer(self, question_id):
+        """Returns the question, the last answer to it and the answer value to
+        regrade along with a message.  The question is None if there is
+        nothing to regrade, the message then says why.
+        """
         try:
             question = self.questions.get(id=question_id)
             msg = 'User: {0}; Quiz: {1}; Question: {2}.\n'.format(
@@ -2627,31 +2638,24 @@ class AnswerPaper(models.Model):
                 self.user, self.question_paper.quiz.description,
                 question_id
             )
-            return False, f'{msg} Question not in the answer paper.'
+            return None, None, None, f'{msg} Question not in the answer paper.'
         user_answer = self.answers.filter(question=question).last()
         if not user_answer or not user_answer.answer:
-            return False, f'{msg} Did not answer.'
+            return None, None, None, f'{msg} Did not answer.'
         if question.type in ['mcc', 'arrange']:
             try:
                 answer = literal_eval(user_answer.answer)
                 if type(answer) is not list:
-                    return (False, f'{msg} {question.type} answer not a list.')
+                    return (None, None, None,
+                            f'{msg} {question.type} answer not a list.')
             except Exception:
-                return (False, f'{msg} {question.type} answer submission error')
+                return (None, None, None,
+                        f'{msg} {question.type} answer submission error')
         else:
             answer = user_answer.answer
-        json_data = question.consolidate_answer_data(answer, self.user, True) \
-            if question.type == 'code' else None
-        result = self.validate_answer(answer, question,
-                                      json_data, user_answer.id,
-                                      server_port=server_port
-                                      )
-        if question.type == "code":
-            url = '{0}:{1}'.format(SERVER_HOST_NAME, server_port)
-            check_result = get_result_from_code_server(url, result['uid'],
-                                                       block=True
-                                                       )
-            result = json.loads(check_result.get('result'))
+        return question, user_answer, answer, msg
+
+    def _set_regrade_result(self, question, user_answer, result):
         user_answer.correct = result.get('success')
         user_answer.error = json.dumps(result.get('error'))
         if result.get('success'):
@@ -2670,8 +2674,86 @@ class AnswerPaper(models.Model):
                 user_answer.marks = 0
         user_answer.save()
         self.update_marks('completed')
+
+    def regrade(self, question_id, server_port=SERVER_POOL_PORT):
+        question, user_answer, answer, msg = self._get_regrade_answer(
+            question_id
+        )
+        if question is None:
+            return False, msg
+        json_data = question.consolidate_answer_data(answer, self.user, True) \
+            if question.type == 'code' else None
+        result = self.validate_answer(answer, question,
+                                      json_data, user_answer.id,
+                                      server_port=server_port,
+                                      lane=BACKGROUND
+                                      )
+        if question.type == "code":
+            url = '{0}:{1}'.format(SERVER_HOST_NAME, server_port)
+            check_result = get_result_from_code_server(url, result['uid'],
+                                                       block=True
+                                                       )
+            result = json.loads(check_result.get('result'))
+        self._set_regrade_result(question, user_answer, result)
         return True, msg
 
+    @staticmethod
+    def regrade_papers(answerpapers, question_id,
+                       server_port=SERVER_POOL_PORT):
+        """Regrade a question for several answer papers.
+
+        Code answers are sent to the code server in batches so that they are
+        checked in parallel rather than one after the other.  A batch holds
+        at most one answer per user, as the answers of a user are checked
+        in the same directory.
+
+        Returns a list of (answerpaper, success, msg) tuples.
+        """
+        url = '{0}:{1}'.format(SERVER_HOST_NAME, server_port)
+        regraded = []
+        batches = []
+        for paper in answerpapers:
+            question, user_answer, answer, msg = paper._get_regrade_answer(
+                question_id
+            )
+            if question is None:
+                regraded.append((paper, False, msg))
+            elif question.type == 'code':
+                json_data = question.consolidate_answer_data(
+                    answer, paper.user, True
+                )
+                user_dir = paper.user.profile.get_user_dir()
+                batch = next(
+                    (b for b in batches if user_dir not in b['dirs']), None
+                )
+                if batch is None:
+                    batch = {'dirs': set(), 'jobs': [], 'pending': {}}
+                    batches.append(batch)
+                batch['dirs'].add(user_dir)
+                batch['jobs'].append((user_answer.id, json_data, user_dir))
+                batch['pending'][str(user_answer.id)] = (
+                    paper, question, user_answer, msg
+                )
+            else:
+                result = paper.validate_answer(answer, question, None,
+                                               user_answer.id,
+                                               server_port=server_port,
+                                               lane=BACKGROUND)
+                paper._set_regrade_result(question, user_answer, result)
+                regraded.append((paper, True, msg))
+
+        for batch in batches:
+            submit_batch(url, batch['jobs'], BACKGROUND)
+            results = get_results_from_code_server(
+                url, list(batch['pending']), block=True
+            )
+            for uid, pending in batch['pending'].items():
+                paper, question, user_answer, msg = pending
+                result = json.loads(results[uid].get('result'))
+                paper._set_regrade_result(question, user_answer, result)
+                regraded.append((paper, True, msg))
+        return regraded
+
     def __str__(self):
         u = self.user
         q = self.question_paper.quiz
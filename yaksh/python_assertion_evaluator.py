@@ -8,6 +8,20 @@ from .base_evaluator import BaseEvaluator
 from .grader import TimeoutException
 from .error_messages import prettify_exceptions
 
+_nose_tools = None
+
+
+def get_nose_tools():
+    """Returns the names `from nose.tools import *` binds, importing them
+    only once.
+    """
+    global _nose_tools
+    if _nose_tools is None:
+        _nose_tools = {}
+        exec("from nose.tools import *", _nose_tools)
+        _nose_tools.pop('__builtins__', None)
+    return _nose_tools
+
 
 class PythonAssertionEvaluator(BaseEvaluator):
     """Tests the Python code obtained from Code Server"""
@@ -67,7 +81,7 @@ class PythonAssertionEvaluator(BaseEvaluator):
         success = False
         mark_fraction = 0.0
         try:
-            exec("from nose.tools import *", self.exec_scope)
+            self.exec_scope.update(get_nose_tools())
             _tests = compile(self.test_case, '<string>', mode='exec')
             exec(_tests, self.exec_scope)
         except TimeoutException:
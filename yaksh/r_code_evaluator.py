@@ -8,6 +8,8 @@ import re
 from .base_evaluator import BaseEvaluator
 from .file_utils import copy_files, delete_files
 from .error_messages import prettify_exceptions
+from .interpreter_session import get_session
+from .settings import INTERPRETER_SESSIONS
 
 
 class RCodeEvaluator(BaseEvaluator):
@@ -54,16 +56,23 @@ class RCodeEvaluator(BaseEvaluator):
             add_err = "Please do not use quit() q() in your code.\
                         \n Otherwise your code will not be evaluated.\n"
 
-        cmd = 'Rscript main.r'
-        ret = self._run_command(cmd, shell=True, stdout=subprocess.PIPE,
-                                stderr=subprocess.PIPE
-                                )
-        proc, stdout, stderr = ret
+        if 'r' in INTERPRETER_SESSIONS:
+            returncode, stdout, stderr = get_session('r').run(
+                os.getcwd(), 'main.r', self.check_timeout,
+                self._limit_session
+            )
+        else:
+            cmd = 'Rscript main.r'
+            ret = self._run_command(cmd, shell=True, stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE
+                                    )
+            proc, stdout, stderr = ret
+            returncode = proc.returncode
 
         if stderr is '':
             # Clean output
             stdout = self._strip_output(stdout)
-            if proc.returncode == 31:
+            if returncode == 31:
                 success, err = True, None
                 mark_fraction = 1.0 if self.partial_grading else 0.0
             else:
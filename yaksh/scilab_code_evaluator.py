@@ -7,6 +7,8 @@ import re
 # Local imports
 from .base_evaluator import BaseEvaluator
 from .file_utils import copy_files, delete_files
+from .interpreter_session import get_session
+from .settings import INTERPRETER_SESSIONS
 
 
 class ScilabCodeEvaluator(BaseEvaluator):
@@ -54,21 +56,28 @@ class ScilabCodeEvaluator(BaseEvaluator):
                         code.\n Otherwise your code will not be evaluated\
                         correctly.\n"
 
-        cmd = 'printf "lines(0)\nexec(\'{0}\',2);\nquit();"'.format(
-            clean_ref_path
-        )
-        cmd += ' | scilab-cli -nb'
-        ret = self._run_command(cmd, shell=True, stdout=subprocess.PIPE,
-                                stderr=subprocess.PIPE
-                                )
-        proc, stdout, stderr = ret
+        if 'scilab' in INTERPRETER_SESSIONS:
+            returncode, stdout = get_session('scilab').run(
+                os.getcwd(), clean_ref_path, self.check_timeout,
+                self._limit_session
+            )
+        else:
+            cmd = 'printf "lines(0)\nexec(\'{0}\',2);\nquit();"'.format(
+                clean_ref_path
+            )
+            cmd += ' | scilab-cli -nb'
+            ret = self._run_command(cmd, shell=True, stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE
+                                    )
+            proc, stdout, stderr = ret
+            returncode = proc.returncode
 
         # Get only the error.
         stderr = self._get_error(stdout)
         if stderr is None:
             # Clean output
             stdout = self._strip_output(stdout)
-            if proc.returncode == 5:
+            if returncode == 5:
                 success, err = True, None
                 mark_fraction = 1.0 if self.partial_grading else 0.0
             else:
@@ -2,22 +2,178 @@
 settings for yaksh app.
 """
 
-from decouple import config
+from decouple import config, Csv
 
 # The number of code server processes to run..
 N_CODE_SERVERS = config('N_CODE_SERVERS', default=5, cast=int)
 
+# The pool grows and shrinks the number of code server processes with the
+# load, between these bounds.  By default it stays at N_CODE_SERVERS.
+MIN_CODE_SERVERS = config('MIN_CODE_SERVERS', default=N_CODE_SERVERS, cast=int)
+MAX_CODE_SERVERS = config('MAX_CODE_SERVERS', default=N_CODE_SERVERS, cast=int)
+
+# Seconds between checks of whether to scale the pool, seconds a job may wait
+# in the queue before more processes are started and seconds the pool must
+# have had nothing queued and idle processes before one is stopped.
+SCALE_INTERVAL = config('SCALE_INTERVAL', default=1, cast=float)
+SCALE_UP_WAIT = config('SCALE_UP_WAIT', default=0.5, cast=float)
+SCALE_DOWN_IDLE = config('SCALE_DOWN_IDLE', default=60, cast=float)
+
+# Evaluate each job in a process forked from the code server process, which
+# has the evaluators already imported.  Jobs are then isolated from each
+# other, and answers that exit or crash only take down their own process.
+FORK_PER_JOB = config('FORK_PER_JOB', default=False, cast=bool)
+
 # The server pool port.  This is the server which returns available server
 # ports so as to minimize load.  This is some random number where no other
 # service is running.  It should be > 1024 and less < 65535 though.
 SERVER_POOL_PORT = config('SERVER_POOL_PORT', default=55555, cast=int)
 
+# URLs of the server pools a code server router spreads jobs over, comma
+# separated, and seconds between its checks on which of them are up.
+CODE_SERVER_NODES = config('CODE_SERVER_NODES', default='', cast=Csv())
+NODE_CHECK_INTERVAL = config('NODE_CHECK_INTERVAL', default=5, cast=float)
+
 # Server host name
 SERVER_HOST_NAME = config('SERVER_HOST_NAME', default='http://localhost')
 
 # Timeout for the code to run in seconds.  This is an integer!
 SERVER_TIMEOUT = config('SERVER_TIMEOUT', default=4, cast=int)
 
+# Number of test cases of a submission checked at the same time.  Only
+# evaluators that run the answer in a process of its own for each test case,
+# like the stdio ones, are checked in parallel, the others one at a time.
+PARALLEL_TEST_CASES = config('PARALLEL_TEST_CASES', default=1, cast=int)
+
+# Stop grading an answer to a question without partial grading at the first
+# test case it fails, that failure is then the only error reported.
+FAIL_FAST = config('FAIL_FAST', default=False, cast=bool)
+
+# Whether the seconds taken by each phase of grading a job are returned with
+# its result, as `timings`, and added up by language in the metrics of the
+# pool: setup, copy_files, compile_code, check_code for each test case and
+# teardown.  Files are mostly copied while compiling or checking, so that
+# time is counted in those phases too.
+GRADING_TIMINGS = config('GRADING_TIMINGS', default=False, cast=bool)
+
+# Directory, preferably on a tmpfs such as /dev/shm, under which each
+# submission is evaluated in a scratch directory of its own that is removed
+# as a whole afterwards.  When empty submissions are evaluated in the user's
+# directory under OUTPUT_DIR and their files removed one by one.
+JOB_WORKSPACE_ROOT = config('JOB_WORKSPACE_ROOT', default='')
+
+# Most seconds a single test case may take, on top of SERVER_TIMEOUT which
+# applies to the whole submission.
+TEST_CASE_TIMEOUT = config('TEST_CASE_TIMEOUT', default=SERVER_TIMEOUT,
+                           cast=float)
+
+# Languages whose code is run by an interpreter kept running across jobs,
+# and set back to a fresh state between them, instead of one started for
+# every test case.  Only 'r' and 'scilab' can be given.  Each interpreter is
+# restarted after INTERPRETER_SESSION_JOBS jobs, to bound what it leaks.
+# Leave it empty unless the R and Scilab evaluator tests, which run the
+# answers with sessions too, pass with the interpreters of the code servers.
+INTERPRETER_SESSIONS = config('INTERPRETER_SESSIONS', default='', cast=Csv())
+INTERPRETER_SESSION_JOBS = config('INTERPRETER_SESSION_JOBS', default=500,
+                                  cast=int)
+
+# Whether a Bash script tested with several sets of arguments is run with
+# all of them by a single bash process, instead of bash being started twice,
+# for the reference script and the answer, for each set.  Questions with
+# files, which are copied again before every run of the answer, always start
+# bash for each set.  Scripts are then sourced in a subshell, which they can
+# tell: $$ is the pid of the shared bash, a top level return works, the
+# files they write are limited to OUTPUT_LIMIT bytes and $0 needs bash 5.
+BASH_BATCH = config('BASH_BATCH', default=False, cast=bool)
+
+# Most seconds the hook code of a test case may take.  When not zero, hooks
+# are run in a child forked off the code server process, and killed once
+# they take longer, so that a hook that hangs or crashes does not take the
+# code server down with it.  Zero runs hooks in the code server process.
+HOOK_TIMEOUT = config('HOOK_TIMEOUT', default=0, cast=float)
+
+# Most bytes of output read from a process started for a test case, it is
+# killed as soon as it writes more.
+OUTPUT_LIMIT = config('OUTPUT_LIMIT', default=1024 * 1024, cast=int)
+
+# Limits on each process started to compile or run an answer: CPU seconds,
+# bytes of address space, open files and processes.  None means no limit.
+# The process count is that of the user the code servers run as, all its
+# processes in all the jobs running at once, so it is no limit on a single
+# job and is not set unless PROCESSES_LIMIT is given.
+# LANGUAGE_RESOURCE_LIMITS overrides some of these for a language.
+RESOURCE_LIMITS = {
+    'cpu': config('CPU_TIME_LIMIT', default=SERVER_TIMEOUT, cast=int),
+    'memory': config('MEMORY_LIMIT', default=1024 * 1024 * 1024, cast=int),
+    'files': config('OPEN_FILES_LIMIT', default=256, cast=int),
+    'processes': config('PROCESSES_LIMIT', default=0, cast=int) or None,
+}
+LANGUAGE_RESOURCE_LIMITS = {
+    # The JVM reserves far more address space than it uses, and its threads,
+    # like those of javac, add up to more CPU seconds than the time taken.
+    'java': {'memory': None, 'cpu': None},
+}
+
+# Maximum time in seconds the server pool holds a request for a result open
+# while waiting for the job to finish (long polling).
+RESULT_WAIT_TIMEOUT = config('RESULT_WAIT_TIMEOUT', default=30, cast=int)
+
+# Maximum time in seconds the web API holds a browser's request for a result
+# open.  Each such request ties up a synchronous Django worker, so keep this
+# short and let the browser poll again.
+API_RESULT_WAIT = config('API_RESULT_WAIT', default=2, cast=float)
+
+# Timeouts in seconds used by clients of the server pool for connecting and
+# for reading a response.  Refused connections are retried a few times with
+# an exponential backoff (backoff * 2 ** (n - 1) seconds before retry n).
+POOL_CONNECT_TIMEOUT = config('POOL_CONNECT_TIMEOUT', default=5, cast=float)
+POOL_READ_TIMEOUT = config('POOL_READ_TIMEOUT', default=30, cast=float)
+POOL_CONNECT_RETRIES = config('POOL_CONNECT_RETRIES', default=3, cast=int)
+POOL_RETRY_BACKOFF = config('POOL_RETRY_BACKOFF', default=0.2, cast=float)
+
+# A code server process busy with one job for SERVER_TIMEOUT plus this many
+# seconds is taken to have hung and is replaced.  The pool checks on its
+# processes every SUPERVISE_INTERVAL seconds.
+WORKER_HANG_MARGIN = config('WORKER_HANG_MARGIN', default=10, cast=float)
+SUPERVISE_INTERVAL = config('SUPERVISE_INTERVAL', default=1, cast=float)
+
+# Finished results that are never read, say because the browser tab was
+# closed, are dropped after RESULT_TTL seconds.  At most MAX_RESULTS of them
+# are held, the oldest are dropped first.  Expired results are looked for
+# every RESULT_EXPIRE_INTERVAL seconds.
+RESULT_TTL = config('RESULT_TTL', default=3600, cast=float)
+MAX_RESULTS = config('MAX_RESULTS', default=10000, cast=int)
+RESULT_EXPIRE_INTERVAL = config('RESULT_EXPIRE_INTERVAL', default=60,
+                                cast=float)
+
+# Identical submissions, the same answer to the same test cases and files,
+# made within DEDUP_TTL seconds of one another are evaluated only once and
+# the later ones get the result of the first.  Leave it at zero when answers
+# may legitimately give different results from run to run, say because they
+# use random numbers.  The results of at most DEDUP_MAX_ENTRIES submissions
+# are kept for this.
+DEDUP_TTL = config('DEDUP_TTL', default=0, cast=float)
+DEDUP_MAX_ENTRIES = config('DEDUP_MAX_ENTRIES', default=10000, cast=int)
+
+# Directory shared by the code server processes in which compiled test case
+# code is cached, and the most bytes it may hold.  The code servers fill it
+# as the user they run answers as, so answers can write to it too and change
+# the test case code of everyone: only set it when the answers are trusted.
+# Test case code is compiled without the cache when it cannot be written to.
+# An empty value compiles the test case code for every answer.
+COMPILE_CACHE_DIR = config('COMPILE_CACHE_DIR', default='')
+COMPILE_CACHE_SIZE = config('COMPILE_CACHE_SIZE', default=256 * 1024 * 1024,
+                            cast=int)
+
+# Directory shared by the code server processes in which the files of
+# questions, and the archives extracted from them, are cached by content so
+# that archives are not extracted again for every answer.  Files are copied
+# from it, sharing their blocks on file systems such as btrfs and XFS.  An
+# empty value copies the files from where they were uploaded.
+FILE_CACHE_DIR = config('FILE_CACHE_DIR', default='')
+FILE_CACHE_SIZE = config('FILE_CACHE_SIZE', default=1024 * 1024 * 1024,
+                         cast=int)
+
 # The root of the URL, for example you might be in the situation where you
 # are not hosted as host.org/exam/  but as host.org/foo/exam/ for whatever
 # reason set this to the root you have to serve at.  In the above example
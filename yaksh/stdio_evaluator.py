@@ -1,6 +1,7 @@
 from __future__ import unicode_literals
 import os
 import signal
+import subprocess
 
 # Local imports
 from .base_evaluator import BaseEvaluator
@@ -9,25 +10,62 @@ from .error_messages import compare_outputs
 
 
 class StdIOEvaluator(BaseEvaluator):
+    # The answer is run in its own process for each test case.
+    parallel_check = True
+
     def evaluate_stdio(self, user_answer, proc,
                        expected_input, expected_output):
         success = False
+        expected_output = expected_output.replace("\r", "")
+        # Once the answer prints a wrong line or more lines than expected it
+        # is wrong, so there is no need to read any more of its output.
+        expected_lines = expected_output.splitlines()
         try:
             if expected_input:
                 ip = expected_input.replace(",", " ")
                 encoded_input = '{0}\n'.format(ip).encode('utf-8')
-                user_output_bytes, output_err_bytes = proc.communicate(
-                                                           encoded_input
-                                                           )
+                user_output_bytes, output_err_bytes, cut = self._communicate(
+                    proc, encoded_input, expected_lines
+                )
             else:
-                user_output_bytes, output_err_bytes = proc.communicate()
+                user_output_bytes, output_err_bytes, cut = self._communicate(
+                    proc, expected_lines=expected_lines
+                )
             user_output = user_output_bytes.decode('utf-8')
         except TimeoutException:
             os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
             raise
-        expected_output = expected_output.replace("\r", "")
+        except subprocess.TimeoutExpired:
+            os.killpg(os.getpgid(proc.pid), signal.SIGKILL)
+            proc.wait()
+            raise TimeoutException('Code took too long to run.')
         success, err = compare_outputs(expected_output,
                                        user_output,
                                        expected_input
                                        )
+        if cut:
+            success = False
+            line_no = self._first_wrong_line(user_output, expected_lines)
+            if line_no is None:
+                err["error_msg"] = ("Incorrect Answer: Your code was stopped "
+                                    "as it printed more output than "
+                                    "expected.")
+            else:
+                err["error_line_numbers"] = [line_no]
+                err["error_msg"] = ("Incorrect Answer: Your code was stopped "
+                                    "as line number {0} did not match."
+                                    .format(line_no + 1))
         return success, err
+
+    def _first_wrong_line(self, user_output, expected_lines):
+        """Returns the index of the first complete line of `user_output`
+        which is not the expected one, None when there is none.
+        """
+        for line_no, (line, expected_line) in \
+                enumerate(zip(user_output.splitlines(True), expected_lines)):
+            text = line.splitlines()[0]
+            # The last line may have been cut short, only complete lines
+            # are compared.
+            if text != line and text != expected_line:
+                return line_no
+        return None
@@ -1589,6 +1589,36 @@ class AnswerPaperTestCases(unittest.TestCase):
         self.assertEqual(self.answer.marks, 0)
         self.assertFalse(self.answer.correct)
 
+    def test_regrade_papers_code_answer(self):
+        # Given
+        user_answer = dedent("""\
+                                def add(a,b):
+                                    return a+b
+                             """)
+        self.answer = Answer(question=self.question1,
+                             answer=user_answer,
+                             correct=False,
+                             marks=0
+                             )
+        self.answer.save()
+        self.answerpaper.answers.add(self.answer)
+
+        # When
+        regraded = AnswerPaper.regrade_papers([self.answerpaper],
+                                              self.question1.id,
+                                              self.SERVER_POOL_PORT
+                                              )
+
+        # Then
+        self.answer = self.answerpaper.answers.filter(question=self.question1
+                                                      ).last()
+        self.assertEqual(len(regraded), 1)
+        answerpaper, success, msg = regraded[0]
+        self.assertEqual(answerpaper, self.answerpaper)
+        self.assertTrue(success)
+        self.assertTrue(self.answer.correct)
+        self.assertEqual(self.answer.marks, self.question1.points)
+
     def test_validate_and_regrade_mcq_correct_answer(self):
         # Given
         mcq_answer = str(self.mcq_based_testcase.id)
@@ -4,12 +4,21 @@ try:
     from Queue import Queue
 except ImportError:
     from queue import Queue
+from multiprocessing import Pipe
+import signal
 from threading import Thread
+import time
 import unittest
 import urllib
 
-from yaksh.code_server import ServerPool, SERVER_POOL_PORT, submit, get_result
-from yaksh import settings
+from tornado.web import HTTPError
+
+from yaksh.code_server import (
+    ServerPool, SERVER_POOL_PORT, submit, get_result, submit_batch,
+    get_results, get_wait, evaluate_in_child, INTERACTIVE, BACKGROUND
+)
+from yaksh.code_server_metrics import PoolMetrics
+from yaksh import code_server, settings
 
 
 class TestCodeServer(unittest.TestCase):
@@ -84,6 +93,56 @@ class TestCodeServer(unittest.TestCase):
         data = json.loads(result.get('result'))
         self.assertTrue(data['success'])
 
+    def test_wait_for_result(self):
+        # Given
+        testdata = {
+            'metadata': {
+                'user_answer': 'def f(): return 1',
+                'language': 'python',
+                'partial_grading': False
+            },
+            'test_case_data': [{'test_case': 'assert f() == 1',
+                                'test_case_type': 'standardtestcase',
+                                'weight': 0.0}]
+        }
+
+        # When
+        submit(self.url, '0', json.dumps(testdata), '')
+        result = get_result(self.url, '0', wait=10)
+
+        # Then
+        self.assertEqual(result.get('status'), 'done')
+        data = json.loads(result.get('result'))
+        self.assertTrue(data['success'])
+
+    def test_batch_submission(self):
+        # Given
+        testdata = {
+            'metadata': {
+                'user_answer': 'def f(): return 1',
+                'language': 'python',
+                'partial_grading': False
+            },
+            'test_case_data': [{'test_case': 'assert f() == 1',
+                                'test_case_type': 'standardtestcase',
+                                'weight': 0.0}]
+        }
+        jobs = [('b0', json.dumps(testdata), ''), ('b1', json.dumps(testdata),
+                                                   '')]
+        testdata['metadata']['user_answer'] = 'def f(): return 2'
+        jobs.append(('b2', json.dumps(testdata), ''))
+
+        # When
+        submit_batch(self.url, jobs)
+        results = get_results(self.url, ['b0', 'b1', 'b2'], block=True)
+
+        # Then
+        self.assertEqual(sorted(results), ['b0', 'b1', 'b2'])
+        for uid, success in [('b0', True), ('b1', True), ('b2', False)]:
+            self.assertEqual(results[uid].get('status'), 'done')
+            data = json.loads(results[uid].get('result'))
+            self.assertEqual(data['success'], success)
+
     def test_wrong_answer(self):
         # Given
         testdata = {
@@ -190,6 +249,19 @@ class TestCodeServer(unittest.TestCase):
         expect = '5 processes, 0 running, 0 queued'
         self.assertTrue(expect in data)
 
+    def test_server_pool_metrics(self):
+        # Given
+        url = "http://localhost:%s/metrics" % SERVER_POOL_PORT
+
+        # When
+        response = urllib.request.urlopen(url)
+        data = response.read().decode('utf-8')
+
+        # Then
+        self.assertIn('code_server_processes 5', data)
+        self.assertIn('code_server_queued_jobs{lane="interactive"}', data)
+        self.assertIn('# TYPE code_server_evaluation_seconds histogram', data)
+
     def test_killing_process_revives_it(self):
         # Given
         testdata = {
@@ -225,5 +297,453 @@ class TestCodeServer(unittest.TestCase):
         self.assertTrue(expect in data)
 
 
+class TestServerPoolLanes(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # A pool without workers, jobs stay queued.
+        cls.server_pool = ServerPool(n=0, pool_port=SERVER_POOL_PORT + 1)
+
+    def setUp(self):
+        for jobs in self.server_pool.lanes.values():
+            jobs.clear()
+
+    def test_lane_sizes(self):
+        # When
+        self.server_pool.submit('0', '{}', '', BACKGROUND)
+        self.server_pool.submit('1', '{}', '', BACKGROUND)
+        self.server_pool.submit('2', '{}', '')
+
+        # Then
+        sizes = self.server_pool.get_lane_sizes()
+        self.assertEqual(sizes[INTERACTIVE], 1)
+        self.assertEqual(sizes[BACKGROUND], 2)
+        q_size, alive, running = self.server_pool.get_status()
+        self.assertEqual(q_size, 3)
+
+    def test_interactive_lane_is_drained_first(self):
+        # Given
+        self.server_pool.submit('0', '{}', '', BACKGROUND)
+        self.server_pool.submit('1', '{}', '', INTERACTIVE)
+        pool_end, worker_end = Pipe()
+        self.server_pool.pipes[0] = pool_end
+        self.server_pool.idle.append(0)
+
+        # When
+        self.server_pool._dispatch()
+
+        # Then
+        uid, json_data, user_dir = worker_end.recv()
+        self.assertEqual(uid, '1')
+        self.assertEqual(self.server_pool.busy, {0: '1'})
+        sizes = self.server_pool.get_lane_sizes()
+        self.assertEqual(sizes[INTERACTIVE], 0)
+        self.assertEqual(sizes[BACKGROUND], 1)
+
+
+class TestServerPoolScaling(unittest.TestCase):
+
+    def setUp(self):
+        self.server_pool = ServerPool(n=0, pool_port=SERVER_POOL_PORT + 2,
+                                      min_n=0, max_n=2)
+
+    def tearDown(self):
+        for proc in self.server_pool.processes.values():
+            proc.terminate()
+            proc.join()
+
+    def test_pool_grows_when_jobs_queue_up(self):
+        # Given
+        for uid in range(3):
+            self.server_pool.submit(str(uid), '{}', '')
+
+        # When
+        self.server_pool._autoscale()
+
+        # Then
+        self.assertEqual(len(self.server_pool.processes), 2)
+        when, before, after = self.server_pool.scale_events[-1]
+        self.assertEqual((before, after), (0, 2))
+
+
+class TestServerPoolSupervision(unittest.TestCase):
+
+    def setUp(self):
+        # A free port of its own, as the pool of each test keeps listening.
+        self.server_pool = ServerPool(n=1, pool_port=0)
+        self.server_pool._start_code_servers()
+
+    def tearDown(self):
+        for proc in self.server_pool.processes.values():
+            proc.terminate()
+            proc.join()
+
+    def test_hung_process_is_replaced(self):
+        # Given
+        proc = self.server_pool.processes[0]
+        self.server_pool.idle.clear()
+        self.server_pool.busy[0] = '0'
+        self.server_pool.started[0] = time.time() - 1000
+        self.server_pool.results['0'] = dict(status='running', pid=0,
+                                             result=None)
+
+        # When
+        self.server_pool._supervise()
+
+        # Then
+        self.assertFalse(proc.is_alive())
+        new_proc = self.server_pool.processes[0]
+        self.assertIsNot(new_proc, proc)
+        self.assertTrue(new_proc.is_alive())
+        result = json.loads(self.server_pool.get_result('0'))
+        self.assertEqual(result['status'], 'done')
+        data = json.loads(result['result'])
+        self.assertFalse(data['success'])
+        self.assertIn('stopped responding', data['error'][0])
+
+    def test_dead_process_is_reported_on_first_poll(self):
+        # Given
+        proc = self.server_pool.processes[0]
+        self.server_pool.idle.clear()
+        self.server_pool.busy[0] = '0'
+        self.server_pool.started[0] = time.time()
+        self.server_pool.results['0'] = dict(status='running', pid=0,
+                                             result=None)
+        proc.terminate()
+        proc.join()
+
+        # When
+        result = json.loads(self.server_pool.get_result('0'))
+
+        # Then
+        self.assertEqual(result['status'], 'done')
+        data = json.loads(result['result'])
+        self.assertIn('exit code', data['error'][0])
+        self.assertNotIn('0', self.server_pool.results)
+
+
+class TestServerPoolResults(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server_pool = ServerPool(n=0, pool_port=SERVER_POOL_PORT + 4)
+
+    def setUp(self):
+        self.server_pool.results.clear()
+        self.server_pool.done.clear()
+        for jobs in self.server_pool.lanes.values():
+            jobs.clear()
+        self.done = dict(status='done', result='{}')
+
+    def test_unread_results_expire(self):
+        # Given
+        self.server_pool._set_result('0', dict(self.done))
+        self.server_pool._set_result('1', dict(self.done))
+        self.server_pool.done['0'] -= code_server.RESULT_TTL + 1
+
+        # When
+        self.server_pool._expire_results()
+
+        # Then
+        self.assertEqual(list(self.server_pool.results), ['1'])
+        self.assertEqual(self.server_pool.get_unread_count(), 1)
+        result = json.loads(self.server_pool.get_result('0'))
+        self.assertEqual(result['status'], 'unknown')
+
+    def test_oldest_results_dropped_beyond_cap(self):
+        # Given
+        max_results = code_server.MAX_RESULTS
+        code_server.MAX_RESULTS = 2
+        self.server_pool.submit('queued', '{}', '')
+
+        # When
+        try:
+            for uid in ['0', '1', '2']:
+                self.server_pool._set_result(uid, dict(self.done))
+        finally:
+            code_server.MAX_RESULTS = max_results
+
+        # Then
+        self.assertEqual(sorted(self.server_pool.results),
+                         ['1', '2', 'queued'])
+        self.assertEqual(self.server_pool.get_unread_count(), 2)
+
+    def test_reading_result_forgets_it(self):
+        # Given
+        self.server_pool._set_result('0', dict(self.done))
+
+        # When
+        self.server_pool.get_result('0')
+
+        # Then
+        self.assertEqual(self.server_pool.results, {})
+        self.assertEqual(self.server_pool.get_unread_count(), 0)
+
+    def test_wait_is_validated(self):
+        # When
+        with self.assertRaises(HTTPError) as context:
+            get_wait('soon')
+
+        # Then
+        self.assertEqual(context.exception.status_code, 400)
+        self.assertEqual(get_wait('-5'), 0)
+        self.assertEqual(get_wait('nan'), 0)
+        self.assertEqual(get_wait('2.5'), 2.5)
+        self.assertEqual(get_wait('1e9'), code_server.RESULT_WAIT_TIMEOUT)
+
+
+class TestServerPoolMetrics(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server_pool = ServerPool(n=0, pool_port=SERVER_POOL_PORT + 5)
+
+    def test_metrics_follow_jobs(self):
+        # Given
+        self.server_pool.submit('0', '{}', '', BACKGROUND)
+        self.server_pool.submit('1', '{}', '', BACKGROUND)
+        pool_end, worker_end = Pipe()
+        self.server_pool.pipes[0] = pool_end
+        self.server_pool.idle.append(0)
+        self.server_pool._dispatch()
+        worker_end.recv()
+        stats = dict(duration=0.3, language='python',
+                     test_case_type='standardtestcase', timed_out=True)
+
+        # When
+        worker_end.send(('0', dict(status='done', result='{}'), stats))
+        self.server_pool._read_results(0, pool_end, None)
+        data = self.server_pool.get_metrics()
+
+        # Then
+        self.assertIn('code_server_jobs_submitted_total{lane="background"} 2',
+                      data)
+        self.assertIn('code_server_jobs_started_total{lane="background"} 2',
+                      data)
+        self.assertIn('code_server_jobs_completed_total 1', data)
+        self.assertIn('code_server_queued_jobs{lane="background"} 0', data)
+        self.assertIn('code_server_running_jobs 1', data)
+        self.assertIn('code_server_timeouts_total{language="python"} 1', data)
+        self.assertIn(
+            'code_server_evaluation_seconds_bucket{language="python",'
+            'test_case_type="standardtestcase",le="0.25"} 0', data
+        )
+        self.assertIn(
+            'code_server_evaluation_seconds_bucket{language="python",'
+            'test_case_type="standardtestcase",le="0.5"} 1', data
+        )
+        self.assertIn('code_server_stored_results 2', data)
+
+    def test_phase_timings_by_language(self):
+        # Given
+        metrics = PoolMetrics()
+        stats = dict(duration=0.3, language='python',
+                     test_case_type='standardtestcase', timed_out=False,
+                     timings={'setup': 0.01, 'check_code': [0.2, 0.3]})
+
+        # When
+        metrics.observe_job(stats)
+        data = '\n'.join(metrics.phase_duration.render())
+
+        # Then
+        self.assertIn(
+            'code_server_phase_seconds_count{language="python",'
+            'phase="setup"} 1', data
+        )
+        self.assertIn(
+            'code_server_phase_seconds_count{language="python",'
+            'phase="check_code"} 2', data
+        )
+        self.assertIn(
+            'code_server_phase_seconds_sum{language="python",'
+            'phase="check_code"} 0.5', data
+        )
+
+
+class TestServerPoolDedup(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server_pool = ServerPool(n=0, pool_port=SERVER_POOL_PORT + 12)
+        cls.server_pool.dedup_ttl = 60
+
+    def setUp(self):
+        self.server_pool.results.clear()
+        self.server_pool.done.clear()
+        self.server_pool.dedup.clear()
+        self.server_pool.in_flight.clear()
+        self.server_pool.job_digests.clear()
+        for jobs in self.server_pool.lanes.values():
+            jobs.clear()
+        self.server_pool.idle.clear()
+        self.server_pool.metrics = PoolMetrics()
+        self.pool_end, self.worker_end = Pipe()
+        self.server_pool.pipes[0] = self.pool_end
+        self.server_pool.idle.append(0)
+        self.job = json.dumps({
+            'metadata': {'user_answer': 'def f(): return 1',
+                         'language': 'python'},
+            'test_case_data': [{'test_case': 'assert f() == 1',
+                                'test_case_type': 'standardtestcase'}]
+        })
+        self.stats = dict(duration=0.5, language='python',
+                          test_case_type='standardtestcase', timed_out=False)
+
+    def _finish(self, uid, stats):
+        self.worker_end.send((uid, dict(status='done', result='"ok"'), stats))
+        self.server_pool._read_results(0, self.pool_end, None)
+
+    def test_identical_submissions_are_evaluated_once(self):
+        # Given
+        self.server_pool.submit('0', self.job, '')
+        self.server_pool.submit('1', self.job, '')
+
+        # When
+        self._finish(self.worker_end.recv()[0], self.stats)
+        self.server_pool.submit('2', self.job, '')
+
+        # Then
+        self.assertFalse(self.worker_end.poll())
+        for uid in ['0', '1', '2']:
+            result = json.loads(self.server_pool.get_result(uid))
+            self.assertEqual(result, dict(status='done', result='"ok"'))
+        self.assertEqual(self.server_pool.get_dedup_stats(), (2, 1, 1.0))
+        self.assertIn('code_server_dedup_hits_total 2',
+                      self.server_pool.get_metrics())
+
+    def test_changed_submissions_are_evaluated_again(self):
+        # Given
+        self.server_pool.submit('0', self.job, '')
+        self._finish(self.worker_end.recv()[0], self.stats)
+        job = json.loads(self.job)
+        job['test_case_data'][0]['test_case'] = 'assert f() == 2'
+
+        # When
+        self.server_pool.submit('1', json.dumps(job), '')
+
+        # Then
+        self.assertEqual(self.worker_end.recv()[0], '1')
+
+    def test_resubmitted_uid_keeps_digests_apart(self):
+        # Given
+        job = json.loads(self.job)
+        job['test_case_data'][0]['test_case'] = 'assert f() == 2'
+        new_job = json.dumps(job)
+        self.server_pool.submit('0', self.job, '')
+        self.server_pool.submit('0', new_job, '')
+
+        # When
+        self._finish(self.worker_end.recv()[0], self.stats)
+        self.server_pool.submit('1', new_job, '')
+        self.server_pool.submit('2', self.job, '')
+
+        # Then
+        self.assertEqual(json.loads(self.server_pool.get_result('1')),
+                         dict(status='not started'))
+        self.assertEqual(json.loads(self.server_pool.get_result('2')),
+                         dict(status='done', result='"ok"'))
+        self.assertEqual(self.worker_end.recv()[0], '0')
+        self.worker_end.send(
+            ('0', dict(status='done', result='"new"'), self.stats)
+        )
+        self.server_pool._read_results(0, self.pool_end, None)
+        self.assertEqual(json.loads(self.server_pool.get_result('1')),
+                         dict(status='done', result='"new"'))
+        self.assertEqual(self.server_pool.in_flight, {})
+
+    def test_queued_twin_is_moved_up_to_the_lane_waiting_for_it(self):
+        # Given
+        self.server_pool.idle.clear()
+        job = json.loads(self.job)
+        job['test_case_data'][0]['test_case'] = 'assert f() == 2'
+        self.server_pool.submit('0', json.dumps(job), '', lane=BACKGROUND)
+        self.server_pool.submit('1', self.job, '', lane=BACKGROUND)
+
+        # When
+        self.server_pool.submit('2', self.job, '', lane=INTERACTIVE)
+        self.server_pool.idle.append(0)
+        self.server_pool._dispatch()
+
+        # Then
+        self.assertEqual(self.worker_end.recv()[0], '1')
+        self.assertEqual(dict(self.server_pool.get_lane_sizes()),
+                         {INTERACTIVE: 0, BACKGROUND: 1})
+
+    def test_timed_out_results_are_not_kept(self):
+        # Given
+        self.stats['timed_out'] = True
+        self.server_pool.submit('0', self.job, '')
+        self._finish(self.worker_end.recv()[0], self.stats)
+
+        # When
+        self.server_pool.submit('1', self.job, '')
+
+        # Then
+        self.assertEqual(self.worker_end.recv()[0], '1')
+
+    def test_kept_results_expire(self):
+        # Given
+        self.server_pool.submit('0', self.job, '')
+        self._finish(self.worker_end.recv()[0], self.stats)
+        digest, (done_at, result, duration) = \
+            list(self.server_pool.dedup.items())[0]
+        self.server_pool.dedup[digest] = (done_at - 61, result, duration)
+
+        # When
+        self.server_pool._expire_results()
+
+        # Then
+        self.assertEqual(len(self.server_pool.dedup), 0)
+
+
+class TestEvaluateInChild(unittest.TestCase):
+
+    def setUp(self):
+        self.testdata = {
+            'metadata': {
+                'user_answer': 'def f(): return 1',
+                'language': 'python',
+                'partial_grading': False
+            },
+            'test_case_data': [{'test_case': 'assert_equal(f(), 1)',
+                                'test_case_type': 'standardtestcase',
+                                'weight': 0.0}]
+        }
+
+    def test_correct_answer(self):
+        # When
+        result = evaluate_in_child(self.testdata, '')
+
+        # Then
+        self.assertTrue(result['success'])
+
+    def test_exiting_answer_only_ends_the_child(self):
+        # Given
+        self.testdata['metadata']['user_answer'] = 'import os; os._exit(3)'
+
+        # When
+        result = evaluate_in_child(self.testdata, '')
+
+        # Then
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error'], ['Process ended with exit code 3.'])
+
+    def test_answer_killed_by_a_signal(self):
+        # Given
+        self.testdata['metadata']['user_answer'] = (
+            'import os, signal; os.kill(os.getpid(), signal.SIGKILL)'
+        )
+
+        # When
+        result = evaluate_in_child(self.testdata, '')
+
+        # Then
+        self.assertFalse(result['success'])
+        self.assertEqual(
+            result['error'],
+            ['Process was killed by signal %s.' % signal.SIGKILL]
+        )
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,181 @@
+from __future__ import unicode_literals
+import asyncio
+import json
+from multiprocessing import Process
+import unittest
+import urllib
+
+from tornado import gen
+from tornado.ioloop import IOLoop
+
+from yaksh.code_server import ServerPool, SERVER_POOL_PORT, submit, get_result
+from yaksh.code_server_router import PoolRouter
+from yaksh import settings
+
+
+def run_on_own_loop(func):
+    """Run the coroutine `func` on an event loop of its own, so that the
+    servers other tests left on the current one are not run with it.
+    """
+    old_loop = asyncio.get_event_loop()
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return IOLoop.current().run_sync(func)
+    finally:
+        asyncio.set_event_loop(old_loop)
+        loop.close()
+
+
+def run_pool(port):
+    settings.code_evaluators['python']['standardtestcase'] = \
+        "yaksh.python_assertion_evaluator.PythonAssertionEvaluator"
+    ServerPool(n=1, pool_port=port).run()
+
+
+def run_router(nodes, port):
+    PoolRouter(nodes, port=port).run()
+
+
+class TestPoolRouter(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.nodes = ['http://localhost:%s' % (SERVER_POOL_PORT + port)
+                     for port in (7, 8)]
+        cls.router = PoolRouter(cls.nodes, port=SERVER_POOL_PORT + 6)
+
+    def setUp(self):
+        self.router.owners.clear()
+        self.router.draining.clear()
+        self.router.down.clear()
+        for node in self.nodes:
+            self.router.outstanding[node] = 0
+
+    def test_least_loaded_node_is_chosen(self):
+        # When
+        nodes = [self.router._assign(str(uid)) for uid in range(4)]
+
+        # Then
+        self.assertEqual(sorted(nodes), sorted(self.nodes * 2))
+        self.assertEqual(list(self.router.outstanding.values()), [2, 2])
+
+        # When
+        for uid in ['0', '2']:
+            self.router._forget(uid)
+
+        # Then
+        self.assertEqual(nodes[0], nodes[2])
+        self.assertEqual(self.router._assign('4'), nodes[0])
+
+    def test_drained_node_gets_no_jobs(self):
+        # Given
+        node, other = self.nodes
+        self.router._assign('0')
+
+        # When
+        self.router.drain(node)
+        nodes = set(self.router._assign(str(uid)) for uid in range(1, 4))
+
+        # Then
+        self.assertEqual(nodes, set([other]))
+        states = dict((n, state) for n, count, state in
+                      self.router.get_status())
+        self.assertEqual(states[node], 'draining')
+
+        # When
+        self.router._forget('0')
+
+        # Then
+        states = dict((n, state) for n, count, state in
+                      self.router.get_status())
+        self.assertEqual(states[node], 'drained')
+
+    def test_unreachable_node_keeps_its_jobs(self):
+        # Given
+        @gen.coroutine
+        def get_results():
+            router = PoolRouter(self.nodes, port=SERVER_POOL_PORT + 14)
+            node = router._assign('0')
+            results = yield router.get_results(['0'])
+            return router, node, results
+
+        # When
+        router, node, results = run_on_own_loop(get_results)
+
+        # Then
+        self.assertEqual(results, {'0': {'status': 'running'}})
+        self.assertEqual(router.owners['0'][0], node)
+        self.assertIn(node, router.down)
+
+
+class TestPoolRouterWithPools(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        ports = [SERVER_POOL_PORT + port for port in (10, 11)]
+        cls.nodes = ['http://localhost:%s' % port for port in ports]
+        cls.url = 'http://localhost:%s' % (SERVER_POOL_PORT + 9)
+        cls.processes = [Process(target=run_pool, args=(port,))
+                         for port in ports]
+        cls.processes.append(
+            Process(target=run_router,
+                    args=(cls.nodes, SERVER_POOL_PORT + 9))
+        )
+        for proc in cls.processes:
+            proc.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        for proc in cls.processes:
+            proc.terminate()
+            proc.join()
+
+    def test_jobs_are_spread_over_pools(self):
+        # Given
+        testdata = {
+            'metadata': {
+                'user_answer': 'def f(): return 1',
+                'language': 'python',
+                'partial_grading': False
+            },
+            'test_case_data': [{'test_case': 'assert f() == 1',
+                                'test_case_type': 'standardtestcase',
+                                'weight': 0.0}]
+        }
+
+        # When
+        for uid in range(4):
+            submit(self.url, str(uid), json.dumps(testdata), '')
+        response = urllib.request.urlopen(self.url)
+        status = response.read().decode('utf-8')
+        results = [get_result(self.url, str(uid), block=True, wait=10)
+                   for uid in range(4)]
+
+        # Then
+        for node in self.nodes:
+            self.assertIn('%s: up, 2 outstanding' % node, status)
+        for result in results:
+            self.assertEqual(result.get('status'), 'done')
+            self.assertTrue(json.loads(result.get('result'))['success'])
+
+    def test_rejected_jobs_do_not_take_the_node_down(self):
+        # Given
+        node = self.nodes[0]
+
+        @gen.coroutine
+        def post():
+            router = PoolRouter(self.nodes, port=SERVER_POOL_PORT + 13)
+            code = yield router._post(node, dict(jobs='[]', lane='unknown'))
+            return router, code
+
+        # When
+        router, code = run_on_own_loop(post)
+
+        # Then
+        self.assertEqual(code, 400)
+        self.assertNotIn(node, router.down)
+
+
+if __name__ == '__main__':
+    unittest.main()